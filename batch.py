@@ -0,0 +1,164 @@
+import multiprocessing
+
+from frontier import PriorityFrontier
+from searchstate import Path, SearchState, SearchResult
+
+
+class NodeGoal:
+    """
+    Goal predicate that matches the node with the given id. Unlike a lambda, it can be sent to worker processes, see run_batch,
+    and two NodeGoals for the same target are equal, so it can serve as a cache key, see querycache.QueryCache.
+    """
+    def __init__(self, target):
+        self.target = target
+
+    def __call__(self, node):
+        return node.get_id() == self.target
+
+    def __eq__(self, other):
+        return isinstance(other, NodeGoal) and self.target == other.target
+
+    def __hash__(self):
+        return hash(self.target)
+
+
+def sweep(start, goals, limits=None):
+    """
+    One-to-many shortest path search (Dijkstra) from start, which answers the queries for all goal predicates in goals at
+    once. Nodes are settled in order of their distance from the start, and every settled node is tested against the goals
+    that have not been reached yet, so the search stops as soon as all of them are settled.
+
+    Returns a list with one searchstate.SearchResult per goal. The path and distance are the same as astar with the default
+    heuristic would find for that goal, visited and expanded are the counts of the shared search at the time the goal was
+    reached.
+    """
+    state = SearchState(start, limits)
+    nodeList = PriorityFrontier(lazy=True)
+    nodeList.push(start.get_id(), start, 0)
+    results = [None] * len(goals)
+    # indices of the goals that have not been reached yet
+    pending = list(range(len(goals)))
+
+    while len(nodeList) > 0 and pending:
+        if state.exceeded(len(nodeList)):
+            break
+        currentNode, _ = nodeList.pop()
+        remaining = []
+        for i in pending:
+            if goals[i](currentNode):
+                results[i] = state.result(currentNode)
+            else:
+                remaining.append(i)
+        pending = remaining
+        if not pending:
+            break
+        g = state.cost(currentNode)
+        for index, neighbor in enumerate(state.expand(currentNode)):
+            newCost = g + neighbor.cost
+            if state.relax(neighbor.target, currentNode, neighbor.cost, newCost, index):
+                nodeList.push(neighbor.target.get_id(), neighbor.target, newCost)
+
+    for i in pending:
+        results[i] = state.result()
+    return results
+
+
+# Graph shared with the worker processes of run_batch, see _sweep_ids
+_shared_nodes = None
+
+
+def _set_shared_nodes(nodes):
+    # Pool initializer, forked workers inherit nodes without copying it
+    global _shared_nodes
+    _shared_nodes = nodes
+
+
+def _sweep_ids(task):
+    # Runs in a worker process: answers the queries of one start node on the shared graph, and returns the results with
+    # the (node id, edge cost, edge index) entries of the parent map along the path in place of the path, so that they can
+    # be sent back without pickling the graph
+    (startId, goals, limits) = task
+    results = sweep(_shared_nodes[startId], goals, limits)
+    return [([(n.get_id(),) + r.path.parents[n.get_id()][1:] for n in r.path], r.distance, r.visited, r.expanded, r.status,
+             r.limit) for r in results]
+
+
+def _path_of(links, nodes):
+    # Rebuilds a searchstate.Path in this process from the entries returned by _sweep_ids
+    if not links:
+        return []
+    parents = {}
+    node = None
+    for (nid, cost, index) in links:
+        parents[nid] = (node, cost, index)
+        node = nodes[nid]
+    return Path(parents, node)
+
+
+def run_batch(queries, nodes=None, processes=None, limits=None):
+    """
+    Answers a list of (start, goal) queries, where start is a graph.Node and goal a goal predicate, and returns one
+    searchstate.SearchResult per query, in the same order. Queries with the same start node (by id) share a single sweep.
+
+    With processes set to a number of worker processes greater than 1, the sweeps of different start nodes run in parallel.
+    This needs nodes, the finite graph the queries are about as a mapping from node ids to nodes (such as graph.Austria or a
+    csrgraph.CSRGraph), and picklable goal predicates such as NodeGoal. On platforms that support it, the workers are forked
+    and share the graph with this process instead of receiving a copy of it.
+
+    The limits apply to each sweep separately.
+    """
+    # group the queries by start node, keeping the order in which start nodes first appear
+    groups = {}
+    for (i, (start, goal)) in enumerate(queries):
+        group = groups.get(start.get_id())
+        if group is None:
+            group = groups[start.get_id()] = (start, [], [])
+        group[1].append(i)
+        group[2].append(goal)
+
+    results = [None] * len(queries)
+    if processes is None or processes <= 1 or len(groups) <= 1:
+        for (start, indices, goals) in groups.values():
+            for (i, result) in zip(indices, sweep(start, goals, limits)):
+                results[i] = result
+        return results
+
+    if nodes is None:
+        raise ValueError("run_batch needs the graph (nodes) to run queries in worker processes")
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    tasks = [(startId, goals, limits) for (startId, (start, indices, goals)) in groups.items()]
+    with context.Pool(processes, initializer=_set_shared_nodes, initargs=(nodes,)) as pool:
+        for ((start, indices, goals), groupResults) in zip(groups.values(), pool.map(_sweep_ids, tasks)):
+            for (i, (path, distance, visited, expanded, status, limit)) in zip(indices, groupResults):
+                results[i] = SearchResult(_path_of(path, nodes), distance, visited, expanded, status, limit)
+    return results
+
+
+def main():
+    """
+    Answers the queries between all pairs of nodes of Austria serially and with a pool of two worker processes, and compares
+    the results with pathfinding.dijkstra.
+    """
+    import graph
+    import pathfinding
+
+    nodes = graph.Austria
+    queries = [(nodes[a], NodeGoal(b)) for a in nodes for b in nodes]
+    serial = run_batch(queries)
+    parallel = run_batch(queries, nodes, processes=2)
+    for ((start, goal), s, p) in zip(queries, serial, parallel):
+        expected = pathfinding.dijkstra(start, goal)
+        for result in (s, p):
+            assert result.distance == expected.distance, (start.get_id(), goal.target, result.distance, expected.distance)
+            assert result.status == expected.status
+            assert [n.get_id() for n in result.path][-1:] == [goal.target]
+            assert sum(edge.cost for edge in result.path.edges()) == result.distance
+        assert [n.get_id() for n in s.path] == [n.get_id() for n in p.path]
+    print(len(queries), "queries ok, serially and with 2 processes")
+
+
+if __name__ == "__main__":
+    main()
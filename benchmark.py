@@ -0,0 +1,243 @@
+"""
+Benchmarks for the search algorithms in pathfinding.py on generated graphs of configurable size.
+
+    python benchmark.py run --sizes 1000 10000 100000 --output results.json
+    python benchmark.py compare old.json new.json
+
+The run command searches every workload with bfs, dfs, greedy, astar and dijkstra, and records the wall time, the peak
+memory allocated during the search (measured with tracemalloc, in a second run so that it does not distort the timing),
+the expanded nodes per second and the visited/expanded counts, as JSON. The compare command reports every measurement of
+the second file that is worse than in the first one by more than a threshold, and exits with status 1 if there is any.
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+import graph
+import pathfinding
+from searchstate import SearchLimits
+
+
+def grid_workload(size, seed):
+    """
+    Square 4-connected grid with about size cells, 20% of which are blocked, between the free cells closest to the top left
+    and the bottom right corner that are connected to each other. Edges cost 1, the heuristic is the Manhattan distance.
+    """
+    rng = random.Random(seed)
+    side = max(2, int(math.sqrt(size)))
+    free = [rng.random() >= 0.2 for i in range(side * side)]
+    nodes = [i for i in range(side * side) if free[i]]
+    edges = []
+    for i in nodes:
+        (r, c) = divmod(i, side)
+        if c + 1 < side and free[i + 1]:
+            edges.append((i, i + 1, 1))
+        if r + 1 < side and free[i + side]:
+            edges.append((i, i + side, 1))
+    g = graph.make_geom_graph(nodes, edges)
+    component = _components(side * side, edges)
+    largest = Counter(component[i] for i in nodes).most_common(1)[0][0]
+    connected = [i for i in nodes if component[i] == largest]
+    start = min(connected, key=lambda i: sum(divmod(i, side)))
+    target = max(connected, key=lambda i: sum(divmod(i, side)))
+    (tr, tc) = divmod(target, side)
+
+    def heuristic(n):
+        (r, c) = divmod(n.get_id(), side)
+        return abs(r - tr) + abs(c - tc)
+    return g[start], heuristic, lambda n: n.get_id() == target
+
+
+def geometric_workload(size, seed):
+    """
+    Road-like random geometric graph: size points in the unit square, every point connected to all points within a radius
+    chosen to give about 6 neighbors on average, with the Euclidean distance (times 1000) as cost and as heuristic. The
+    search goes between two opposite corners of the square.
+    """
+    rng = random.Random(seed)
+    points = [(rng.random(), rng.random()) for i in range(size)]
+    radius = math.sqrt(6.0 / (math.pi * size))
+    # bucket the points into cells of the size of the radius, so only neighboring cells have to be compared
+    cells = {}
+    for (i, (x, y)) in enumerate(points):
+        cells.setdefault((int(x / radius), int(y / radius)), []).append(i)
+    edges = []
+    for ((cx, cy), members) in cells.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in cells.get((cx + dx, cy + dy), ()):
+                    for i in members:
+                        if i < j:
+                            d = math.dist(points[i], points[j])
+                            if d <= radius:
+                                edges.append((i, j, round(d * 1000, 3)))
+    g = graph.make_geom_graph(range(size), edges)
+    # pick the corners among the nodes of the largest connected component, so that a path exists
+    component = _components(size, edges)
+    largest = Counter(component).most_common(1)[0][0]
+    connected = [i for i in range(size) if component[i] == largest]
+    start = min(connected, key=lambda i: points[i][0] + points[i][1])
+    target = max(connected, key=lambda i: points[i][0] + points[i][1])
+    (tx, ty) = points[target]
+
+    def heuristic(n):
+        (x, y) = points[n.get_id()]
+        return math.hypot(x - tx, y - ty) * 1000
+    return g[start], heuristic, lambda n: n.get_id() == target
+
+
+def _components(size, edges):
+    # union-find over the edges, returns the representative of every node's connected component
+    parent = list(range(size))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    for (a, b, d) in edges:
+        parent[find(a)] = find(b)
+    return [find(i) for i in range(size)]
+
+
+def implicit_workload(size, seed):
+    """
+    The infinite graph of graph.InfNode, searching from 1 to size, with the (non-admissible) distance between the numbers as
+    heuristic, as in pathfinding.main.
+    """
+    return graph.InfNode(1), lambda n: abs(n.get_id() - size), lambda n: n.get_id() == size
+
+
+WORKLOADS = {"grid": grid_workload, "geometric": geometric_workload, "implicit": implicit_workload}
+
+
+def measure(algorithm, start, heuristic, goal, limits, memory=True, repeat=1):
+    """
+    Runs one search and returns its measurements as a dictionary. The time is the best of repeat runs.
+    """
+    search = pathfinding.ALGORITHMS[algorithm]
+    seconds = float("inf")
+    for i in range(repeat):
+        began = time.perf_counter()
+        result = search(start, heuristic, goal, limits)
+        seconds = min(seconds, time.perf_counter() - began)
+    record = {"seconds": seconds,
+              "nodes_per_second": result.expanded / seconds if seconds > 0 else None,
+              "visited": result.visited,
+              "expanded": result.expanded,
+              "distance": result.distance if result.path else None,
+              "status": result.status,
+              "limit": result.limit}
+    if memory:
+        tracemalloc.start()
+        search(start, heuristic, goal, limits)
+        record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return record
+
+
+def run(workloads, sizes, algorithms, seed=0, max_seconds=60.0, memory=True, repeat=1, log=sys.stderr):
+    """
+    Runs every algorithm on every workload and size, and returns the report as a JSON-compatible dictionary. Every search is
+    limited to max_seconds. Searches on the infinite graph are also limited to expanding 100 times the size in nodes, and
+    depth-first search there to a frontier of 15000 nodes, as in pathfinding.main, since it runs off towards ever larger
+    numbers.
+    """
+    results = []
+    for name in workloads:
+        for size in sizes:
+            began = time.perf_counter()
+            (start, heuristic, goal) = WORKLOADS[name](size, seed)
+            build = time.perf_counter() - began
+            for algorithm in algorithms:
+                if name != "implicit":
+                    limits = SearchLimits(max_seconds=max_seconds)
+                elif algorithm == "dfs":
+                    limits = SearchLimits(max_frontier=15000, max_expanded=100 * size, max_seconds=max_seconds)
+                else:
+                    limits = SearchLimits(max_expanded=100 * size, max_seconds=max_seconds)
+                record = {"workload": name, "size": size, "algorithm": algorithm, "build_seconds": build}
+                record.update(measure(algorithm, start, heuristic, goal, limits, memory, repeat))
+                results.append(record)
+                if log is not None:
+                    print("%-10s %9d %-8s %9.4fs %9d expanded %s" % (name, size, algorithm, record["seconds"],
+                                                                    record["expanded"], record["status"]), file=log)
+    return {"python": platform.python_version(), "platform": platform.platform(), "seed": seed, "results": results}
+
+
+def compare(old, new, threshold=0.1, min_seconds=0.001):
+    """
+    Compares two reports returned by run. Returns a list of regressions, one string for every run present in both reports
+    whose time, peak memory or number of expanded nodes grew by more than the threshold (a fraction), or whose search no
+    longer finds a path. Times are only compared for runs that took at least min_seconds, shorter ones are mostly noise.
+    """
+    key = lambda r: (r["workload"], r["size"], r["algorithm"])
+    before = {key(r): r for r in old["results"]}
+    regressions = []
+    for r in new["results"]:
+        o = before.get(key(r))
+        if o is None:
+            continue
+        name = "%s/%d/%s" % key(r)
+        for measurement in ("seconds", "peak_bytes", "expanded"):
+            if measurement == "seconds" and max(o["seconds"], r["seconds"]) < min_seconds:
+                continue
+            if o.get(measurement) and r.get(measurement) is not None and r[measurement] > o[measurement] * (1 + threshold):
+                regressions.append("%s: %s %.6g -> %.6g (+%.0f%%)" % (name, measurement, o[measurement], r[measurement],
+                                                                   100.0 * (r[measurement] / o[measurement] - 1)))
+        if o["status"] == "found" and r["status"] != "found":
+            regressions.append("%s: status %s -> %s" % (name, o["status"], r["status"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the search algorithms in pathfinding.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+    runParser = commands.add_parser("run", help="run the benchmarks and write a JSON report")
+    runParser.add_argument("--workloads", nargs="+", choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    runParser.add_argument("--algorithms", nargs="+", choices=list(pathfinding.ALGORITHMS),
+                           default=list(pathfinding.ALGORITHMS))
+    runParser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000])
+    runParser.add_argument("--seed", type=int, default=0)
+    runParser.add_argument("--max-seconds", type=float, default=60.0, help="time limit per search")
+    runParser.add_argument("--repeat", type=int, default=3, help="report the best time of this many runs")
+    runParser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    runParser.add_argument("--output", help="file to write the report to (default: standard output)")
+    compareParser = commands.add_parser("compare", help="compare two reports and list regressions")
+    compareParser.add_argument("old")
+    compareParser.add_argument("new")
+    compareParser.add_argument("--threshold", type=float, default=0.1, help="allowed relative increase (default 0.1)")
+    compareParser.add_argument("--min-seconds", type=float, default=0.001, help="ignore times below this (default 0.001)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run(args.workloads, args.sizes, args.algorithms, args.seed, args.max_seconds, not args.no_memory,
+                     args.repeat)
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    regressions = compare(old, new, args.threshold, args.min_seconds)
+    for regression in regressions:
+        print(regression)
+    if not regressions:
+        print("no regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
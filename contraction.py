@@ -0,0 +1,426 @@
+"""
+Contraction hierarchies: a preprocessing step for static graphs built with graph.make_geom_graph (or csrgraph.CSRGraph)
+that makes shortest path queries touch only a few hundred nodes even on large road networks.
+
+The nodes are contracted one by one, in order of importance (least important first). Contracting a node removes it from
+the remaining graph, and adds a shortcut edge between two of its neighbors wherever the path over the contracted node is
+the only shortest path between them. Every node then only keeps its edges to nodes contracted after it (its upward edges),
+and a query runs a Dijkstra search upward from both the start and the target, which meet at the most important node of a
+shortest path. Shortcuts remember the node they skip, so the path can be unpacked into the edges of the original graph.
+
+    python contraction.py
+
+checks the distances of random queries against csrgraph.dijkstra_ids on random graphs and the graphs of graph.py.
+"""
+import struct
+import sys
+from array import array
+from heapq import heappush, heappop
+
+import graph
+from csrgraph import CSRGraph
+from searchstate import Path, SearchResult, EXHAUSTED
+
+MAGIC = b"CHGR"
+VERSION = 2
+HEADER = struct.Struct("<4sIQQ")
+
+
+class ContractionHierarchy:
+    """
+    Contraction hierarchy of a symmetric graph, a CSRGraph or a dictionary of nodes as returned by graph.make_geom_graph.
+    Since every edge has a reverse edge with the same cost, the upward edges serve the forward search from the start as well
+    as the backward search from the target.
+
+    The hierarchy is stored in flat arrays like a CSRGraph: rank[i] is the position of node number i in the contraction
+    order, and its upward edges are stored at the positions offsets[i] to offsets[i+1]-1 of targets, costs and middles,
+    where middles is the node number a shortcut skips, or -1 for the edges of the original graph.
+
+    Nodes are ordered by their edge difference (the number of shortcuts contracting them would add, minus the number of
+    edges it removes) plus the number of their neighbors that were already contracted, which spreads the contractions
+    evenly over the graph. Whether a shortcut is needed is decided by a witness search that settles at most settle_limit
+    nodes; if it gives up, the shortcut is added, which costs some space but never correctness.
+    """
+    def __init__(self, g, settle_limit=100):
+        self.nodes = g
+        if not isinstance(g, CSRGraph):
+            g = CSRGraph.from_geom_graph(g)
+        self.graph = g
+        n = len(g)
+
+        # the remaining graph, as one dictionary per node: neighbor number -> (cost, skipped node or -1). Parallel edges are
+        # merged into the cheapest one.
+        adj = [{} for i in range(n)]
+        for i in range(n):
+            for (j, d) in g.neighbors(i):
+                if j != i and (j not in adj[i] or d < adj[i][j][0]):
+                    adj[i][j] = (d, -1)
+        deleted = [0] * n
+        priority = [0] * n
+        upward = [None] * n
+        rank = array("l", [-1]) * n
+        self.shortcuts = 0
+
+        nodeList = []
+        for i in range(n):
+            priority[i] = self._priority(adj, deleted, i, settle_limit)
+            heappush(nodeList, (priority[i], i))
+        order = 0
+        while nodeList:
+            p, v = heappop(nodeList)
+            if rank[v] >= 0 or p != priority[v]:
+                continue
+            # the priorities are only updated for the neighbors of contracted nodes, so check that v is still the least
+            # important node before contracting it
+            shortcuts = _shortcuts(adj, v, settle_limit)
+            p = len(shortcuts) - len(adj[v]) + deleted[v]
+            if nodeList and p > nodeList[0][0]:
+                priority[v] = p
+                heappush(nodeList, (p, v))
+                continue
+            rank[v] = order
+            order += 1
+            upward[v] = list(adj[v].items())
+            for w in adj[v]:
+                del adj[w][v]
+                deleted[w] += 1
+            for (u, w, d) in shortcuts:
+                old = adj[u].get(w)
+                if old is None or d < old[0]:
+                    adj[u][w] = (d, v)
+                    adj[w][u] = (d, v)
+                    self.shortcuts += 1
+            neighbors = adj[v]
+            adj[v] = None
+            for w in neighbors:
+                priority[w] = self._priority(adj, deleted, w, settle_limit)
+                heappush(nodeList, (priority[w], w))
+
+        offsets = array("l", [0])
+        targets = array("l")
+        costs = array("d")
+        middles = array("l")
+        for i in range(n):
+            for (j, (d, middle)) in upward[i]:
+                targets.append(j)
+                costs.append(d)
+                middles.append(middle)
+            offsets.append(len(targets))
+        self.rank = rank
+        self.offsets = offsets
+        self.targets = targets
+        self.costs = costs
+        self.middles = middles
+
+    @staticmethod
+    def _priority(adj, deleted, v, settle_limit):
+        return len(_shortcuts(adj, v, settle_limit)) - len(adj[v]) + deleted[v]
+
+    def __len__(self):
+        return len(self.rank)
+
+    def edge_count(self):
+        """
+        Returns the number of upward edges, including the shortcuts.
+        """
+        return len(self.targets)
+
+    def _search(self, s, t):
+        # Bidirectional upward Dijkstra search between node numbers s and t. Returns the distance, the node where the two
+        # searches meet (-1 if they do not), the parent maps of both directions (node -> (previous node, position of the
+        # upward edge)) and the visited and expanded counts.
+        offsets = self.offsets
+        targets = self.targets
+        costs = self.costs
+        inf = float("inf")
+        dists = ({s: 0}, {t: 0})
+        parents = ({s: None}, {t: None})
+        nodeLists = ([(0, s)], [(0, t)])
+        best = inf
+        meeting = -1
+        visited = 2 if s != t else 1
+        expanded = 0
+        while nodeLists[0] or nodeLists[1]:
+            # grow the direction with the closer frontier, and stop once neither can lead to a shorter path
+            if not nodeLists[1] or (nodeLists[0] and nodeLists[0][0][0] <= nodeLists[1][0][0]):
+                side = 0
+            else:
+                side = 1
+            nodeList = nodeLists[side]
+            if nodeList[0][0] >= best:
+                break
+            dist = dists[side]
+            parent = parents[side]
+            d, u = heappop(nodeList)
+            if d > dist[u]:
+                continue
+            expanded += 1
+            other = dists[1 - side].get(u)
+            if other is not None and d + other < best:
+                best = d + other
+                meeting = u
+            for pos in range(offsets[u], offsets[u + 1]):
+                w = targets[pos]
+                newCost = d + costs[pos]
+                old = dist.get(w)
+                if old is None or newCost < old:
+                    if old is None:
+                        visited += 1
+                    dist[w] = newCost
+                    parent[w] = (u, pos)
+                    heappush(nodeList, (newCost, w))
+        return best, meeting, parents[0], parents[1], visited, expanded
+
+    def _up_edge(self, v, w):
+        # position of the upward edge from v to w
+        for pos in range(self.offsets[v], self.offsets[v + 1]):
+            if self.targets[pos] == w:
+                return pos
+        raise KeyError((v, w))
+
+    def _unpack(self, a, b, pos, out):
+        # Appends the (node number, cost) pairs of the original edges that the upward edge at pos (between a and b, in
+        # either direction) stands for to out, going from a to b
+        stack = [(a, b, pos)]
+        while stack:
+            (a, b, pos) = stack.pop()
+            middle = self.middles[pos]
+            if middle < 0:
+                out.append((b, self.costs[pos]))
+            else:
+                # the skipped node was contracted before a and b, so both halves are upward edges of it
+                stack.append((middle, b, self._up_edge(middle, b)))
+                stack.append((a, middle, self._up_edge(middle, a)))
+
+    def route_ids(self, s, t):
+        """
+        Returns the shortest path between the node numbers s and t as a list of (node number, cost) pairs for the original
+        edges from s to t (empty if s == t), or None if there is no path.
+        """
+        (best, meeting, forward, backward, visited, expanded) = self._search(s, t)
+        if meeting < 0:
+            return None
+        return self._route(meeting, forward, backward)
+
+    def _route(self, meeting, forward, backward):
+        up = []
+        v = meeting
+        while forward[v] is not None:
+            (u, pos) = forward[v]
+            up.append((u, v, pos))
+            v = u
+        route = []
+        for (u, v, pos) in reversed(up):
+            self._unpack(u, v, pos, route)
+        v = meeting
+        while backward[v] is not None:
+            (u, pos) = backward[v]
+            self._unpack(v, u, pos, route)
+            v = u
+        return route
+
+    def distance_ids(self, s, t):
+        """
+        Returns the shortest path distance between the node numbers s and t, inf if there is no path.
+        """
+        return self._search(s, t)[0]
+
+    def query(self, start, target):
+        """
+        Shortest path from start to target, which can be nodes or node ids. Returns a searchstate.SearchResult like
+        pathfinding.astar, with the nodes of the graph the hierarchy was built from; the edges() of its path are the
+        original graph.Edge objects. The distance is the sum of their costs, added up from the start like Dijkstra's
+        algorithm does. visited and expanded count the nodes of the two upward searches.
+        """
+        index = self.graph.index
+        s = index[start.get_id() if isinstance(start, graph.Node) else start]
+        t = index[target.get_id() if isinstance(target, graph.Node) else target]
+        (best, meeting, forward, backward, visited, expanded) = self._search(s, t)
+        if meeting < 0:
+            return SearchResult([], 0, visited, expanded, EXHAUSTED)
+        names = self.graph.names
+        node = self.nodes[names[s]]
+        parents = {node.get_id(): (None, 0, None)}
+        distance = 0
+        for (v, cost) in self._route(meeting, forward, backward):
+            distance = distance + cost
+            nextNode = self.nodes[names[v]]
+            parents[nextNode.get_id()] = (node, cost, None)
+            node = nextNode
+        return SearchResult(Path(parents, node), distance, visited, expanded)
+
+    def save(self, path):
+        """
+        Writes the hierarchy to the file at path, with little-endian int64 and float64 arrays, so that it can be loaded on
+        any platform.
+        """
+        sections = [array("q", self.rank), array("q", self.offsets), array("q", self.targets), array("d", self.costs),
+                    array("q", self.middles)]
+        if sys.byteorder != "little":
+            for section in sections:
+                section.byteswap()
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self.rank), len(self.targets)))
+            for section in sections:
+                section.tofile(f)
+
+    @classmethod
+    def load(cls, path, g):
+        """
+        Loads a hierarchy written by save. g has to be the graph the hierarchy was built from, with the nodes in the same
+        order.
+        """
+        result = cls.__new__(cls)
+        result.nodes = g
+        if not isinstance(g, CSRGraph):
+            g = CSRGraph.from_geom_graph(g)
+        result.graph = g
+        with open(path, "rb") as f:
+            (magic, version, n, m) = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("%s is not a version %d contraction hierarchy" % (path, VERSION))
+            if n != len(g):
+                raise ValueError("%s was built for a graph with %d nodes, not %d" % (path, n, len(g)))
+            for (name, typecode, count) in [("rank", "q", n), ("offsets", "q", n + 1), ("targets", "q", m),
+                                            ("costs", "d", m), ("middles", "q", m)]:
+                a = array(typecode)
+                a.fromfile(f, count)
+                if sys.byteorder != "little":
+                    a.byteswap()
+                setattr(result, name, a)
+        result.shortcuts = sum(1 for middle in result.middles if middle >= 0)
+        return result
+
+
+def _shortcuts(adj, v, settle_limit):
+    # Returns the shortcuts (u, w, cost) that contracting v would need: one for every pair of neighbors of v that are not
+    # connected by a path of at most the same cost that avoids v
+    neighbors = list(adj[v].items())
+    shortcuts = []
+    for (i, (u, (du, _))) in enumerate(neighbors):
+        others = neighbors[i + 1:]
+        if not others:
+            break
+        limit = du + max(dw for (w, (dw, _)) in others)
+        dist = _witness(adj, u, v, limit, settle_limit)
+        for (w, (dw, _)) in others:
+            if dist.get(w, limit + 1) > du + dw:
+                shortcuts.append((u, w, du + dw))
+    return shortcuts
+
+
+def _witness(adj, source, skip, limit, settle_limit):
+    # Dijkstra search from source in the remaining graph without the node skip, up to the distance limit or settle_limit
+    # settled nodes. Returns the distances found.
+    dist = {source: 0}
+    nodeList = [(0, source)]
+    settled = 0
+    while nodeList and settled < settle_limit:
+        d, u = heappop(nodeList)
+        if d > dist[u]:
+            continue
+        if d > limit:
+            break
+        settled += 1
+        for (w, (c, _)) in adj[u].items():
+            if w == skip:
+                continue
+            newCost = d + c
+            if newCost < dist.get(w, newCost + 1):
+                dist[w] = newCost
+                heappush(nodeList, (newCost, w))
+    return dist
+
+
+def _random_graph(rng, n, m):
+    # random graph with small integer costs, so that all sums are exact, and some parallel edges and isolated nodes
+    edges = []
+    for k in range(m):
+        a = rng.randrange(n)
+        b = rng.randrange(n)
+        if a != b:
+            edges.append((a, b, float(rng.randint(1, 20))))
+    return graph.make_geom_graph(range(n), edges)
+
+
+def _check(nodes, ch, queries, rng, exact=True):
+    # Compares the query results of ch on nodes against csrgraph.dijkstra_ids, and checks that the unpacked path is made of
+    # edges of the graph. Returns the number of nodes expanded by the queries.
+    import math
+    from csrgraph import dijkstra_ids
+
+    g = ch.graph
+    expanded = 0
+    for k in range(queries):
+        s = rng.randrange(len(g))
+        t = rng.randrange(len(g))
+        expected = dijkstra_ids(g, s)[t]
+        result = ch.query(g.names[s], g.names[t])
+        expanded += result.expanded
+        if expected == float("inf"):
+            assert not result.path, (s, t)
+            continue
+        if exact:
+            assert result.distance == expected, (s, t, result.distance, expected)
+        else:
+            assert math.isclose(result.distance, expected, rel_tol=1e-9), (s, t, result.distance, expected)
+        path = result.path
+        assert path[0].get_id() == g.names[s] and path[-1].get_id() == g.names[t]
+        distance = 0
+        for (node, edge) in zip(path.nodes(), path.edges()):
+            assert any(e is edge for e in node.get_neighbors())
+            distance = distance + edge.cost
+        assert distance == result.distance
+    return expanded
+
+
+def main():
+    """
+    Randomized checks of the hierarchies against Dijkstra's algorithm, also after a save and load round trip, and the sizes
+    of the search spaces of their queries.
+    """
+    import os
+    import random
+    import tempfile
+    import time
+    import benchmark
+
+    rng = random.Random(16)
+    for (name, nodes) in [("Austria", graph.Austria), ("TestCase", graph.TestCase)]:
+        ch = ContractionHierarchy(nodes)
+        _check(nodes, ch, 200, rng)
+        # the saved file holds fixed-size little-endian arrays, whatever the platform
+        path = os.path.join(tempfile.mkdtemp(), name + ".ch")
+        ch.save(path)
+        assert os.path.getsize(path) == HEADER.size + 8 * (2 * len(ch.rank) + 1 + 3 * len(ch.targets))
+        loaded = ContractionHierarchy.load(path, nodes)
+        assert (loaded.rank, loaded.offsets, loaded.targets, loaded.costs, loaded.middles) == \
+            (array("q", ch.rank), array("q", ch.offsets), array("q", ch.targets), ch.costs, array("q", ch.middles))
+        _check(nodes, loaded, 200, rng)
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+        print(name, "ok:", ch.shortcuts, "shortcuts")
+    for k in range(50):
+        n = rng.randint(2, 60)
+        nodes = _random_graph(rng, n, rng.randint(n // 2, 3 * n))
+        _check(nodes, ContractionHierarchy(nodes, rng.choice([1, 5, 100])), 30, rng)
+    print("random graphs ok")
+    for size in (1000, 10000):
+        (start, heuristic, goal) = benchmark.geometric_workload(size, 0)
+        nodes = {}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            if node.get_id() not in nodes:
+                nodes[node.get_id()] = node
+                stack.extend(edge.target for edge in node.get_neighbors())
+        began = time.perf_counter()
+        ch = ContractionHierarchy(nodes)
+        seconds = time.perf_counter() - began
+        expanded = _check(nodes, ch, 50, rng, exact=False)
+        print("geometric %d: %.1fs preprocessing, %d shortcuts, %.0f nodes expanded per query (%d nodes)" %
+              (size, seconds, ch.shortcuts, expanded / 50, len(nodes)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+from array import array
+from heapq import heappush, heappop
+
+import graph
+from searchstate import Path, SearchResult, EXHAUSTED
+
+
+class CSRGraph:
+    """
+    Immutable graph in compressed sparse row form, built from the same (nodes, edges) input as graph.make_geom_graph, and,
+    like it, with every edge replaced by two directed edges (to and from).
+
+    Nodes are numbered 0..n-1 in the order they are given. The outgoing edges of node i are stored at the positions
+    offsets[i] to offsets[i+1]-1 of the flat targets (node numbers) and costs arrays, so the whole graph takes a few machine
+    words per edge instead of an Edge object and a name string each. Edge names are only formatted when they are asked for.
+
+    graph[name] (or node(i)) returns a CSRNode that implements the graph.Node protocol, so the graph can be searched with the
+    functions in pathfinding.py. bfs_ids and astar_ids in this module search the integer node numbers directly.
+    """
+    def __init__(self, nodes, edges):
+        self.names = list(nodes)
+        self.index = {}
+        for i, name in enumerate(self.names):
+            self.index[name] = i
+        n = len(self.names)
+        edges = [(self.index[a], self.index[b], d) for (a, b, d) in edges]
+
+        # count the outgoing edges of every node, then turn the counts into start offsets
+        offsets = array("l", [0]) * (n + 1)
+        for (a, b, d) in edges:
+            offsets[a + 1] += 1
+            offsets[b + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        # fill in targets and costs, keeping the order of the edge list, like make_geom_graph does
+        fill = array("l", offsets[:n])
+        targets = array("l", [0]) * offsets[n]
+        costs = array("d", [0.0]) * offsets[n]
+        for (a, b, d) in edges:
+            targets[fill[a]] = b
+            costs[fill[a]] = d
+            fill[a] += 1
+            targets[fill[b]] = a
+            costs[fill[b]] = d
+            fill[b] += 1
+
+        self.offsets = offsets
+        self.targets = targets
+        self.costs = costs
+
+    @classmethod
+    def from_geom_graph(cls, nodes):
+        """
+        Converts a graph built by graph.make_geom_graph (a dictionary of GeomNode objects) into a CSRGraph.
+        """
+        result = cls([], [])
+        result.names = list(nodes)
+        result.index = {}
+        for i, name in enumerate(result.names):
+            result.index[name] = i
+        offsets = array("l", [0])
+        targets = array("l")
+        costs = array("d")
+        for name in result.names:
+            for edge in nodes[name].get_neighbors():
+                targets.append(result.index[edge.target.get_id()])
+                costs.append(edge.cost)
+            offsets.append(len(targets))
+        result.offsets = offsets
+        result.targets = targets
+        result.costs = costs
+        return result
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, name):
+        return CSRNode(self, self.index[name])
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def node(self, i):
+        return CSRNode(self, i)
+
+    def edge_count(self):
+        return len(self.targets)
+
+    def neighbors(self, i):
+        """
+        Returns the (target, cost) pairs of the outgoing edges of node number i.
+        """
+        lo = self.offsets[i]
+        hi = self.offsets[i + 1]
+        return zip(self.targets[lo:hi], self.costs[lo:hi])
+
+    def edge_name(self, pos):
+        """
+        Formats the name of the edge stored at position pos of the targets array, in the same "a - b" form as make_geom_graph.
+        """
+        source = _source_of(self.offsets, pos)
+        return "%s - %s" % (self.names[source], self.names[self.targets[pos]])
+
+
+def _source_of(offsets, pos):
+    # binary search for the node whose range of edge positions contains pos
+    lo = 0
+    hi = len(offsets) - 2
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if offsets[mid] <= pos:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class CSRNode(graph.Node):
+    """
+    A node of a CSRGraph, identified by its name like a GeomNode. Nodes and their edges are created on demand and only hold
+    a reference to the graph and their number.
+    """
+    __slots__ = ("graph", "nr")
+
+    def __init__(self, graph, nr):
+        self.graph = graph
+        self.nr = nr
+
+    def get_id(self):
+        return self.graph.names[self.nr]
+
+    def get_neighbors(self):
+        g = self.graph
+        return [CSREdge(g, pos) for pos in range(g.offsets[self.nr], g.offsets[self.nr + 1])]
+
+
+class CSREdge(graph.Edge):
+    """
+    An edge of a CSRGraph, identified by its position in the graph's arrays. The target node and the name are only
+    created when they are accessed.
+    """
+    def __init__(self, graph, pos):
+        self.graph = graph
+        self.pos = pos
+
+    @property
+    def target(self):
+        return CSRNode(self.graph, self.graph.targets[self.pos])
+
+    @property
+    def cost(self):
+        return self.graph.costs[self.pos]
+
+    @property
+    def name(self):
+        return self.graph.edge_name(self.pos)
+
+
+def _ids_result(g, parent, parentEdge, node, visited, expanded):
+    # Builds the SearchResult for a search over node numbers, following the parent and parent edge position arrays back
+    # from node into the parent map of a searchstate.Path
+    if node is None:
+        return SearchResult([], 0, visited, expanded, EXHAUSTED)
+    end = current = g.node(node)
+    parents = {}
+    distance = 0
+    while parent[node] != node:
+        pos = parentEdge[node]
+        previous = g.node(parent[node])
+        parents[current.get_id()] = (previous, g.costs[pos], pos - g.offsets[previous.nr])
+        distance = distance + g.costs[pos]
+        (node, current) = (parent[node], previous)
+    parents[current.get_id()] = (None, 0, None)
+    return SearchResult(Path(parents, end), distance, visited, expanded)
+
+
+def bfs_ids(g, start, goal):
+    """
+    Breadth-first search over the node numbers of the CSRGraph g. start is a node number and goal a predicate on node numbers.
+    Returns the same result as pathfinding.bfs on the corresponding CSRNode objects, but keeps its state in flat arrays.
+    """
+    offsets = g.offsets
+    targets = g.targets
+    costs = g.costs
+    parent = array("l", [-1]) * len(g)
+    parentEdge = array("l", [0]) * len(g)
+    parent[start] = start
+    visited = 1
+    expanded = 0
+    nodeList = [start]
+    # the list is never shortened, instead head marks the next node to expand
+    head = 0
+    while head < len(nodeList):
+        current = nodeList[head]
+        head += 1
+        expanded += 1
+        for pos in range(offsets[current], offsets[current + 1]):
+            target = targets[pos]
+            if parent[target] < 0:
+                parent[target] = current
+                parentEdge[target] = pos
+                visited += 1
+                if goal(target):
+                    return _ids_result(g, parent, parentEdge, target, visited, expanded)
+                nodeList.append(target)
+    return _ids_result(g, parent, parentEdge, None, visited, expanded)
+
+
+def astar_ids(g, start, heuristic, goal):
+    """
+    A* search over the node numbers of the CSRGraph g. start is a node number, heuristic and goal are functions of node
+    numbers. Returns the same result as pathfinding.astar on the corresponding CSRNode objects.
+    """
+    offsets = g.offsets
+    targets = g.targets
+    costs = g.costs
+    inf = float("inf")
+    parent = array("l", [-1]) * len(g)
+    parentEdge = array("l", [0]) * len(g)
+    dist = array("d", [inf]) * len(g)
+    parent[start] = start
+    dist[start] = 0
+    visited = 1
+    expanded = 0
+    # (f, counter, node) entries, entries whose g value is out of date are skipped when popped
+    nodeList = [(heuristic(start), 0, start, 0)]
+    counter = 1
+    while nodeList:
+        f, _, current, d = heappop(nodeList)
+        if d > dist[current]:
+            continue
+        if goal(current):
+            return _ids_result(g, parent, parentEdge, current, visited, expanded)
+        expanded += 1
+        for pos in range(offsets[current], offsets[current + 1]):
+            target = targets[pos]
+            newCost = d + costs[pos]
+            if newCost < dist[target]:
+                if parent[target] < 0:
+                    visited += 1
+                parent[target] = current
+                parentEdge[target] = pos
+                dist[target] = newCost
+                heappush(nodeList, (newCost + heuristic(target), counter, target, newCost))
+                counter += 1
+    return _ids_result(g, parent, parentEdge, None, visited, expanded)
+
+
+def dijkstra_ids(g, source):
+    """
+    Computes the shortest path distances from node number source to all nodes of the CSRGraph g. Returns an array of
+    distances indexed by node number, with inf for nodes that can not be reached.
+    """
+    offsets = g.offsets
+    targets = g.targets
+    costs = g.costs
+    dist = array("d", [float("inf")]) * len(g)
+    dist[source] = 0
+    nodeList = [(0, source)]
+    while nodeList:
+        d, current = heappop(nodeList)
+        if d > dist[current]:
+            continue
+        for pos in range(offsets[current], offsets[current + 1]):
+            target = targets[pos]
+            newCost = d + costs[pos]
+            if newCost < dist[target]:
+                dist[target] = newCost
+                heappush(nodeList, (newCost, target))
+    return dist
+
+
+def main():
+    """
+    Checks that a CSRGraph built from the edge lists of Austria and TestCase has the same edges as make_geom_graph, and
+    that bfs_ids and astar_ids return the same results as pathfinding.bfs and pathfinding.astar on all pairs of nodes.
+    """
+    import pathfinding
+
+    for (name, nodes, table) in [("Austria", graph.Austria, graph.AustriaHeuristic),
+                                 ("TestCase", graph.TestCase, graph.TestCaseHeuristic)]:
+        # every edge once, as seen from its end that comes first in the dictionary
+        order = {a: i for (i, a) in enumerate(nodes)}
+        edges = [(a, e.target.get_id(), e.cost) for (a, node) in nodes.items() for e in node.get_neighbors()
+                 if order[a] < order[e.target.get_id()]]
+        geom = graph.make_geom_graph(list(nodes), edges)
+        g = CSRGraph(list(nodes), edges)
+        for a in nodes:
+            expected = [(e.target.get_id(), e.cost, e.name) for e in geom[a].get_neighbors()]
+            actual = [(e.target.get_id(), e.cost, e.name) for e in g[a].get_neighbors()]
+            assert expected == actual, (a, expected, actual)
+        for a in nodes:
+            for b in nodes:
+                t = g.index[b]
+                goal = lambda n: n.get_id() == b
+                heuristic = lambda n: table[b][n.get_id()]
+                results = [(bfs_ids(g, g.index[a], lambda i: i == t), pathfinding.bfs(geom[a], goal)),
+                           (astar_ids(g, g.index[a], lambda i: table[b][g.names[i]], lambda i: i == t),
+                            pathfinding.astar(geom[a], heuristic, goal))]
+                for (actual, expected) in results:
+                    assert [n.get_id() for n in actual.path] == [n.get_id() for n in expected.path], (a, b)
+                    assert tuple(actual[1:]) == tuple(expected[1:]), (a, b, actual[1:], expected[1:])
+                    if actual.path:
+                        assert actual.path.names() == expected.path.names(), (a, b)
+        print(name, "ok:", len(g), "nodes,", g.edge_count(), "edges")
+
+
+if __name__ == "__main__":
+    main()
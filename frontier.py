@@ -0,0 +1,63 @@
+from heapq import heappush, heappop
+
+
+class PriorityFrontier:
+    """
+    Binary-heap frontier for the best-first searches (greedy, A*). Push and pop are O(log n), and entries with equal priority
+    are popped in the order they were pushed, so searches are deterministic.
+
+    Every entry is stored under a key (usually the node id). With lazy=True the frontier holds at most one live entry per key:
+    pushing a key that is already on the frontier with a lower priority replaces the old entry, which stays in the heap and is
+    skipped once it reaches the top (lazy deletion instead of an explicit decrease-key).
+    """
+    def __init__(self, lazy=False):
+        self.lazy = lazy
+        self.heap = []
+        self.counter = 0
+        # key -> (priority, counter) of the live entry, only used in lazy mode
+        self.live = {}
+        self.size = 0
+
+    def push(self, key, item, priority):
+        """
+        Adds item with the given priority. In lazy mode, returns False (and does nothing) if key is already on the frontier
+        with the same or a lower priority.
+        """
+        if self.lazy:
+            old = self.live.get(key)
+            if old is not None:
+                if old[0] <= priority:
+                    return False
+            else:
+                self.size += 1
+            self.live[key] = (priority, self.counter)
+        else:
+            self.size += 1
+        heappush(self.heap, (priority, self.counter, key, item))
+        self.counter += 1
+        return True
+
+    def pop(self):
+        """
+        Removes and returns the pair (item, priority) with the lowest priority.
+        """
+        while True:
+            priority, counter, key, item = heappop(self.heap)
+            if self.lazy:
+                if self.live.get(key) != (priority, counter):
+                    # superseded by a later push with a lower priority
+                    continue
+                del self.live[key]
+            self.size -= 1
+            return item, priority
+
+    def peek_priority(self):
+        """
+        Returns the lowest priority on the frontier without removing it.
+        """
+        while self.lazy and self.live.get(self.heap[0][2]) != self.heap[0][:2]:
+            heappop(self.heap)
+        return self.heap[0][0]
+
+    def __len__(self):
+        return self.size
@@ -1,6 +1,8 @@
 
 
 class Node:
+    # Node has no instance state, so subclasses that declare __slots__ (like csrgraph.CSRNode) get instances without a __dict__
+    __slots__ = ()
     def get_id(self):
         """
         Returns a unique identifier for the node (for example, the name, the hash value of the contents, etc.), used to compare two nodes for equality.
@@ -14,6 +16,8 @@ class Node:
         return []
     def __eq__(self, other):
         return self.get_id() == other.get_id()
+    def __hash__(self):
+        return hash(self.get_id())
         
 class Edge:
     """
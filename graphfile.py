@@ -0,0 +1,225 @@
+"""
+Binary file format for CSRGraph graphs, which can be memory-mapped and searched without building any Python objects per
+node or edge. All numbers are little-endian, the file consists of:
+    - a 40 byte header: the magic bytes b"CSRG", the format version and the type of the node ids (uint32 each, the type
+      is ID_STR or ID_INT), 4 bytes of padding, and the number of nodes n, edges m and bytes of node names (uint64 each)
+    - the adjacency offsets (n+1 int64), targets (m int64) and costs (m float64) of the CSRGraph
+    - the node id table: the start offsets of the node names in the name data (n+1 int64), followed by the UTF-8 encoded
+      names; integer ids are stored in decimal
+"""
+import csv
+import mmap
+import struct
+import sys
+from array import array
+
+import graph
+from csrgraph import CSRGraph
+
+MAGIC = b"CSRG"
+VERSION = 2
+HEADER = struct.Struct("<4sII4xQQQ")
+
+# Types of the node ids of a graph file
+ID_STR = 0
+ID_INT = 1
+
+
+def save(g, path):
+    """
+    Writes g to the file at path. g is a CSRGraph, or a dictionary of nodes as returned by graph.make_geom_graph. The node
+    ids have to be either all strings or all integers, so that they load back unchanged; other ids raise ValueError.
+    """
+    if not isinstance(g, CSRGraph):
+        g = CSRGraph.from_geom_graph(g)
+    if all(isinstance(name, str) for name in g.names):
+        idType = ID_STR
+    elif all(isinstance(name, int) and not isinstance(name, bool) for name in g.names):
+        idType = ID_INT
+    else:
+        raise ValueError("graph files can only store node ids that are all strings or all integers")
+    names = [str(name).encode("utf-8") for name in g.names]
+    nameOffsets = array("q", [0])
+    for name in names:
+        nameOffsets.append(nameOffsets[-1] + len(name))
+    sections = [array("q", g.offsets), array("q", g.targets), array("d", g.costs), nameOffsets]
+    if sys.byteorder != "little":
+        for section in sections:
+            section.byteswap()
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, idType, len(g), g.edge_count(), nameOffsets[-1]))
+        for section in sections:
+            section.tofile(f)
+        f.write(b"".join(names))
+
+
+def convert_edges(nodes, edges, path):
+    """
+    Writes the graph given by a list of nodes and a list of (a, b, distance) edges, as passed to graph.make_geom_graph, to
+    the file at path.
+    """
+    save(CSRGraph(nodes, edges), path)
+
+
+def convert_csv(csvPath, path):
+    """
+    Converts an edge list in CSV format, with one "a,b,distance" line per edge, to a graph file at path. Nodes are numbered
+    in the order in which they first appear. A first line that does not have a number in the distance column is skipped
+    as a header.
+    """
+    nodes = []
+    seen = set()
+    edges = []
+    with open(csvPath, newline="") as f:
+        for i, row in enumerate(csv.reader(f)):
+            if not row:
+                continue
+            (a, b, d) = row
+            try:
+                d = float(d)
+            except ValueError:
+                if i == 0:
+                    continue
+                raise
+            for name in (a, b):
+                if name not in seen:
+                    seen.add(name)
+                    nodes.append(name)
+            edges.append((a, b, d))
+    convert_edges(nodes, edges, path)
+
+
+class _NameTable:
+    """
+    Read-only sequence of the node names stored in a mapped graph file, decoded on access (and converted to int for files
+    of integer ids).
+    """
+    def __init__(self, offsets, data, idType):
+        self.offsets = offsets
+        self.data = data
+        self.idType = idType
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        name = bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+        return int(name) if self.idType == ID_INT else name
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class MappedGraph(CSRGraph):
+    """
+    A CSRGraph whose arrays are served directly from a memory-mapped graph file, see save(). Loading is independent of the
+    size of the graph, and processes that load the same file share its pages through the OS page cache.
+
+    Node names are decoded when they are needed, and the name to node number index used by graph[name] is only built on its
+    first use. Like any CSRGraph, it can be searched through its CSRNode objects or directly with bfs_ids and astar_ids.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if sys.byteorder != "little":
+            raise ValueError("memory-mapped graph files can only be loaded on little-endian machines")
+        self.buffer = buffer = memoryview(self.map)
+        (magic, version, idType, n, m, nameBytes) = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION or idType not in (ID_STR, ID_INT):
+            raise ValueError("%s is not a version %d graph file" % (path, VERSION))
+        pos = HEADER.size
+        self.offsets = buffer[pos:pos + 8 * (n + 1)].cast("q")
+        pos += 8 * (n + 1)
+        self.targets = buffer[pos:pos + 8 * m].cast("q")
+        pos += 8 * m
+        self.costs = buffer[pos:pos + 8 * m].cast("d")
+        pos += 8 * m
+        nameOffsets = buffer[pos:pos + 8 * (n + 1)].cast("q")
+        pos += 8 * (n + 1)
+        self.names = _NameTable(nameOffsets, buffer[pos:pos + nameBytes], idType)
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {}
+            for i, name in enumerate(self.names):
+                self._index[name] = i
+        return self._index
+
+    def close(self):
+        """
+        Releases the buffers and unmaps the file. The graph and its nodes can not be used afterwards.
+        """
+        self._index = None
+        for view in (self.offsets, self.targets, self.costs, self.names.offsets, self.names.data, self.buffer):
+            view.release()
+        self.map.close()
+
+
+def load(path):
+    return MappedGraph(path)
+
+
+def main():
+    """
+    Round-trip check: writes the Austria and TestCase graphs, a graph with integer node ids and a graph converted from a CSV
+    edge list to disk, maps them again, and compares every edge as well as the results of the searches with the original
+    make_geom_graph graphs.
+    """
+    import os
+    import random
+    import tempfile
+
+    import pathfinding
+
+    rng = random.Random(5)
+    edges = [(rng.randrange(20), rng.randrange(20), float(rng.randint(1, 20))) for i in range(50)]
+    edges = [(a, b, d) for (a, b, d) in edges if a != b]
+    numbered = graph.make_geom_graph(range(20), edges)
+    named = [(str(a), str(b), d) for (a, b, d) in edges]
+    fromCsv = graph.make_geom_graph(sorted({a for (a, b, d) in named} | {b for (a, b, d) in named}), named)
+
+    directory = tempfile.mkdtemp()
+    csvPath = os.path.join(directory, "edges.csv")
+    with open(csvPath, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["a", "b", "distance"])
+        writer.writerows(named)
+    writers = [("Austria", graph.Austria, lambda path: save(graph.Austria, path)),
+               ("TestCase", graph.TestCase, lambda path: save(graph.TestCase, path)),
+               ("Numbered", numbered, lambda path: save(numbered, path)),
+               ("CSV", fromCsv, lambda path: convert_csv(csvPath, path))]
+    for (name, nodes, write) in writers:
+        path = os.path.join(directory, name + ".csrg")
+        write(path)
+        mapped = load(path)
+        assert sorted(mapped.names) == sorted(nodes)
+        for (nodeName, node) in nodes.items():
+            expected = [(e.target.get_id(), e.cost, e.name) for e in node.get_neighbors()]
+            actual = [(e.target.get_id(), e.cost, e.name) for e in mapped[nodeName].get_neighbors()]
+            assert expected == actual, (nodeName, expected, actual)
+            for target in nodes:
+                goal = lambda n: n.get_id() == target
+                expected = pathfinding.astar(node, pathfinding.default_heuristic, goal)
+                actual = pathfinding.astar(mapped[nodeName], pathfinding.default_heuristic, goal)
+                assert [n.get_id() for n in expected[0]] == [n.get_id() for n in actual[0]]
+                assert tuple(expected[1:]) == tuple(actual[1:])
+        print(name, "round trip ok:", len(mapped), "nodes,", mapped.edge_count(), "edges,", os.path.getsize(path), "bytes")
+        mapped.close()
+        os.remove(path)
+
+    # ids that would not load back unchanged are refused
+    path = os.path.join(directory, "Tuples.csrg")
+    try:
+        save(graph.make_geom_graph([(0, 0), (0, 1)], [((0, 0), (0, 1), 1)]), path)
+        raise AssertionError("tuple ids were accepted")
+    except ValueError:
+        pass
+    os.remove(csvPath)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
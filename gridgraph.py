@@ -0,0 +1,354 @@
+"""
+Grid maps for uniform-cost pathfinding on 2D occupancy maps, and Jump Point Search on them.
+
+A Grid stores one byte per cell instead of a GeomNode with up to eight Edge objects, and creates its nodes and edges on
+demand, so it can be searched with the functions in pathfinding.py like any other graph. jps is an A* search that only
+expands the jump points of the grid, and skips the many paths of equal length that differ only in the order of their
+moves.
+
+    python gridgraph.py
+
+checks the paths found by jps against pathfinding.dijkstra on random grids.
+"""
+import math
+
+import graph
+from frontier import PriorityFrontier
+from searchstate import Path, SearchState, SearchResult
+
+SQRT2 = math.sqrt(2)
+
+# Moves of the 4-connected and (in addition) the 8-connected grids, as (dx, dy)
+STRAIGHT = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class Grid:
+    """
+    Rectangular map of width x height cells, each of which is either free or blocked. The cells are stored row by row in
+    the bytearray cells, where a nonzero byte means blocked; blocked can be any bytes-like object of width * height bytes in
+    that layout to start from, such as a contiguous NumPy array of bools (see also from_array and from_rows).
+
+    The nodes are the free cells, identified by their (x, y) coordinates. Moving to one of the 4 adjacent cells costs 1. With
+    diagonal=True, moving diagonally costs sqrt(2), and is only allowed if both cells next to the move are free, so paths do
+    not cut corners.
+    """
+    def __init__(self, width, height, blocked=None, diagonal=True):
+        self.width = width
+        self.height = height
+        self.diagonal = diagonal
+        if blocked is None:
+            self.cells = bytearray(width * height)
+        else:
+            self.cells = bytearray(blocked)
+            if len(self.cells) != width * height:
+                raise ValueError("a %d x %d grid needs %d cells, not %d" % (width, height, width * height, len(self.cells)))
+
+    @classmethod
+    def from_rows(cls, rows, blocked="#", diagonal=True):
+        """
+        Builds a grid from a list of strings, one per row, in which the characters in blocked are blocked cells.
+        """
+        rows = list(rows)
+        width = max((len(row) for row in rows), default=0)
+        result = cls(width, len(rows), None, diagonal)
+        for (y, row) in enumerate(rows):
+            for (x, c) in enumerate(row):
+                if c in blocked:
+                    result.cells[y * width + x] = 1
+        return result
+
+    @classmethod
+    def from_array(cls, mask, diagonal=True):
+        """
+        Builds a grid from a 2D NumPy array with one row per row of the grid, whose nonzero entries are blocked cells.
+        """
+        (height, width) = mask.shape
+        return cls(width, height, (mask != 0).astype("uint8").tobytes(), diagonal)
+
+    def __len__(self):
+        return self.width * self.height
+
+    def __getitem__(self, cell):
+        (x, y) = cell
+        return GridNode(self, x, y)
+
+    def __contains__(self, cell):
+        (x, y) = cell
+        return self.free(x, y)
+
+    def node(self, x, y):
+        return GridNode(self, x, y)
+
+    def free(self, x, y):
+        """
+        Returns True if (x, y) is a free cell of the grid.
+        """
+        return 0 <= x < self.width and 0 <= y < self.height and not self.cells[y * self.width + x]
+
+    def block(self, x, y, blocked=True):
+        self.cells[y * self.width + x] = 1 if blocked else 0
+
+    def moves(self, x, y):
+        """
+        Returns the (dx, dy) moves that lead from (x, y) to a neighboring free cell.
+        """
+        free = self.free
+        result = [(dx, dy) for (dx, dy) in STRAIGHT if free(x + dx, y + dy)]
+        if self.diagonal:
+            result.extend((dx, dy) for (dx, dy) in DIAGONAL if free(x + dx, y) and free(x, y + dy) and free(x + dx, y + dy))
+        return result
+
+    def _pruned_moves(self, x, y, dx, dy):
+        # The moves from (x, y) that jump point search follows after arriving in direction (dx, dy): the natural neighbors,
+        # which can not be reached as cheaply without passing (x, y), and the forced neighbors, whose direct route from the
+        # parent is blocked
+        free = self.free
+        result = []
+        if not self.diagonal:
+            if dx:
+                candidates = ((dx, 0), (0, 1), (0, -1))
+            else:
+                candidates = ((0, dy), (1, 0), (-1, 0))
+            return [(mx, my) for (mx, my) in candidates if free(x + mx, y + my)]
+        if dx and dy:
+            if free(x, y + dy):
+                result.append((0, dy))
+            if free(x + dx, y):
+                result.append((dx, 0))
+            if free(x, y + dy) and free(x + dx, y) and free(x + dx, y + dy):
+                result.append((dx, dy))
+        elif dx:
+            nextFree = free(x + dx, y)
+            for side in (1, -1):
+                if free(x, y + side):
+                    if nextFree and free(x + dx, y + side):
+                        result.append((dx, side))
+                    result.append((0, side))
+            if nextFree:
+                result.append((dx, 0))
+        else:
+            nextFree = free(x, y + dy)
+            for side in (1, -1):
+                if free(x + side, y):
+                    if nextFree and free(x + side, y + dy):
+                        result.append((side, dy))
+                    result.append((side, 0))
+            if nextFree:
+                result.append((0, dy))
+        return result
+
+    def _jump(self, x, y, dx, dy, goal):
+        # Moves from (x, y) in direction (dx, dy) until it reaches the goal or a jump point, a cell from which a part of the
+        # grid can be reached that no cheaper path avoiding the cell leads to. Returns the cell, or None if the way is blocked
+        # before.
+        free = self.free
+        while True:
+            if not free(x, y):
+                return None
+            if (x, y) == goal:
+                return (x, y)
+            if dx and dy:
+                # a diagonal move is needed to reach any jump point found by the straight moves from here
+                if self._jump(x + dx, y, dx, 0, goal) is not None or self._jump(x, y + dy, 0, dy, goal) is not None:
+                    return (x, y)
+                if not (free(x + dx, y) and free(x, y + dy)):
+                    return None
+            elif dx:
+                if (free(x, y - 1) and not free(x - dx, y - 1)) or (free(x, y + 1) and not free(x - dx, y + 1)):
+                    return (x, y)
+            else:
+                if (free(x - 1, y) and not free(x - 1, y - dy)) or (free(x + 1, y) and not free(x + 1, y - dy)):
+                    return (x, y)
+                # without diagonal moves, turning is what a vertical move is needed for
+                if not self.diagonal and (self._jump(x + 1, y, 1, 0, goal) is not None or
+                                          self._jump(x - 1, y, -1, 0, goal) is not None):
+                    return (x, y)
+            x += dx
+            y += dy
+
+
+class GridNode(graph.Node):
+    """
+    A free cell of a Grid. Nodes and their edges are created on demand.
+    """
+    __slots__ = ("grid", "x", "y")
+
+    def __init__(self, grid, x, y):
+        self.grid = grid
+        self.x = x
+        self.y = y
+
+    def get_id(self):
+        return (self.x, self.y)
+
+    def get_neighbors(self):
+        g = self.grid
+        return [GridEdge(self, GridNode(g, self.x + dx, self.y + dy), SQRT2 if dx and dy else 1)
+                for (dx, dy) in g.moves(self.x, self.y)]
+
+
+class GridEdge(graph.Edge):
+    """
+    An edge of a Grid. The name is formatted from the coordinates of its ends when it is accessed.
+    """
+    def __init__(self, source, target, cost):
+        self.source = source
+        self.target = target
+        self.cost = cost
+
+    @property
+    def name(self):
+        return "%s - %s" % (self.source.get_id(), self.target.get_id())
+
+
+def octile(goal):
+    """
+    Returns the octile distance heuristic for the goal cell (a GridNode or (x, y)): the length of the shortest path on an
+    empty 8-connected grid.
+    """
+    (gx, gy) = goal.get_id() if isinstance(goal, graph.Node) else goal
+
+    def heuristic(node):
+        dx = abs(node.x - gx)
+        dy = abs(node.y - gy)
+        return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+    return heuristic
+
+
+def manhattan(goal):
+    """
+    Returns the Manhattan distance heuristic for the goal cell (a GridNode or (x, y)), the length of the shortest path on
+    an empty 4-connected grid.
+    """
+    (gx, gy) = goal.get_id() if isinstance(goal, graph.Node) else goal
+
+    def heuristic(node):
+        return abs(node.x - gx) + abs(node.y - gy)
+    return heuristic
+
+
+def jps(start, heuristic, goal, limits=None):
+    """
+    Jump point search from the GridNode start to the goal cell, a GridNode or (x, y). Unlike the searches in pathfinding.py,
+    the goal is a single cell instead of a predicate, since the jumps have to stop there. The heuristic defaults to the
+    octile distance on grids with diagonal moves, and to the Manhattan distance otherwise.
+
+    This is A* over the jump points of the grid: every expanded node only follows the moves that no cheaper path avoiding it
+    could make (see Grid._pruned_moves), and runs in a straight line along each of them until it finds a jump point, which
+    is added to the frontier instead of every cell on the way.
+
+    Returns a searchstate.SearchResult like pathfinding.astar, whose path is a sequence of every cell on the way (the jumps
+    are filled in) and whose edges() are the GridEdges between them. visited and expanded count jump points, not cells.
+    """
+    g = start.grid
+    if isinstance(goal, graph.Node):
+        goal = goal.get_id()
+    if heuristic is None:
+        heuristic = octile(goal) if g.diagonal else manhattan(goal)
+    state = SearchState(start, limits)
+    nodeList = PriorityFrontier(lazy=True)
+    nodeList.push(start.get_id(), start, heuristic(start))
+
+    while len(nodeList) > 0:
+        if state.exceeded(len(nodeList)):
+            return state.result()
+        currentNode, _ = nodeList.pop()
+        (x, y) = (currentNode.x, currentNode.y)
+        if (x, y) == goal:
+            return _result(state, currentNode)
+        cost = state.cost(currentNode)
+        state.expanded += 1
+        parent = state.parents[(x, y)][0]
+        if parent is None:
+            moves = g.moves(x, y)
+        else:
+            moves = g._pruned_moves(x, y, _sign(x - parent.x), _sign(y - parent.y))
+        for (dx, dy) in moves:
+            point = g._jump(x + dx, y + dy, dx, dy, goal)
+            if point is None:
+                continue
+            steps = max(abs(point[0] - x), abs(point[1] - y))
+            d = steps * SQRT2 if dx and dy else steps
+            node = GridNode(g, point[0], point[1])
+            if state.relax(node, currentNode, d, cost + d):
+                nodeList.push(point, node, cost + d + heuristic(node))
+
+    return state.result()
+
+
+def _sign(d):
+    return (d > 0) - (d < 0)
+
+
+def _result(state, goalNode):
+    # Builds the result for the jump points leading to goalNode, with the cells between them filled in. The distance is
+    # added up one move at a time, like pathfinding.astar does.
+    points = [goalNode]
+    while state.parents[points[-1].get_id()][0] is not None:
+        points.append(state.parents[points[-1].get_id()][0])
+    points.reverse()
+    g = goalNode.grid
+    node = points[0]
+    parents = {node.get_id(): (None, 0, None)}
+    distance = 0
+    for point in points[1:]:
+        dx = _sign(point.x - node.x)
+        dy = _sign(point.y - node.y)
+        cost = SQRT2 if dx and dy else 1
+        for i in range(max(abs(point.x - node.x), abs(point.y - node.y))):
+            cell = GridNode(g, node.x + dx, node.y + dy)
+            parents[cell.get_id()] = (node, cost, None)
+            distance = distance + cost
+            node = cell
+    return SearchResult(Path(parents, node), distance, state.visited, state.expanded)
+
+
+def main():
+    """
+    Compares jps with pathfinding.dijkstra and astar on random grids, with and without diagonal moves.
+    """
+    import random
+    import pathfinding
+
+    rng = random.Random(18)
+    for diagonal in (True, False):
+        totals = {"dijkstra": 0, "astar": 0, "jps": 0}
+        for k in range(200):
+            (width, height) = (rng.randint(1, 40), rng.randint(1, 40))
+            density = rng.choice([0.0, 0.1, 0.25, 0.4])
+            g = Grid(width, height, bytes(rng.random() < density for i in range(width * height)), diagonal)
+            free = [(x, y) for y in range(height) for x in range(width) if g.free(x, y)]
+            if not free:
+                continue
+            start = g[rng.choice(free)]
+            target = rng.choice(free)
+            goal = lambda n: n.get_id() == target
+            expected = pathfinding.dijkstra(start, goal)
+            heuristic = octile(target) if diagonal else manhattan(target)
+            results = {"dijkstra": expected, "astar": pathfinding.astar(start, heuristic, goal), "jps": jps(start, None, target)}
+            for (name, result) in results.items():
+                totals[name] += result.expanded
+                assert bool(result.path) == bool(expected.path), (name, width, height, start.get_id(), target)
+                assert math.isclose(result.distance, expected.distance, abs_tol=1e-9), (name, result.distance, expected.distance)
+            path = results["jps"].path
+            if path:
+                assert path[0] == start and path[-1].get_id() == target
+                assert math.isclose(sum(edge.cost for edge in path.edges()), expected.distance, abs_tol=1e-9)
+        print("%s grids ok, expanded nodes over all queries:" % ("8-connected" if diagonal else "4-connected"), totals)
+
+    # one large open map with a few walls, where jump point search pays off the most
+    rows = ["." * 300] * 300
+    g = Grid.from_rows(rows)
+    for x in range(30, 300, 60):
+        for y in range(0, 260):
+            g.block(x, y if x % 120 == 30 else 299 - y)
+    (start, target) = (g[0, 0], (299, 299))
+    for (name, result) in [("astar", pathfinding.astar(start, octile(target), lambda n: n.get_id() == target)),
+                           ("jps", jps(start, None, target))]:
+        print("300x300 map, %s: distance %.3f, visited %d, expanded %d" % (name, result.distance, result.visited,
+                                                                         result.expanded))
+
+
+if __name__ == "__main__":
+    main()
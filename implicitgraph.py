@@ -0,0 +1,167 @@
+from collections import OrderedDict
+
+import graph
+
+
+class ImplicitGraph:
+    """
+    Infinite (or just very large) graph whose edges are generated on demand by a successor function, like graph.InfNode, but
+    with every node interned: as long as a node is in the cache, asking for it again returns the same object. The cache holds
+    at most cache_size nodes, the least recently used ones are evicted first.
+
+    successors is a function that is passed a node id and returns an iterable of (target id, cost, label) triples, one per
+    outgoing edge. The label is only used to format the edge name, and that only happens when the name is accessed, e.g. when
+    a path is printed.
+    """
+    def __init__(self, successors, cache_size=100000):
+        self.successors = successors
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def node(self, nr):
+        """
+        Returns the node with the given id, creating it if it is not in the cache.
+        """
+        node = self.cache.get(nr)
+        if node is None:
+            self.misses += 1
+            node = ImplicitNode(self, nr)
+            self.cache[nr] = node
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.hits += 1
+            self.cache.move_to_end(nr)
+        return node
+
+    def __getitem__(self, nr):
+        return self.node(nr)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class ImplicitNode(graph.Node):
+    """
+    A node of an ImplicitGraph. get_neighbors returns a list like for every other node, iter_neighbors generates the edges
+    one at a time, so that a search that stops at the first goal neighbor never creates the remaining ones.
+    """
+    __slots__ = ("graph", "nr")
+
+    def __init__(self, graph, nr):
+        self.graph = graph
+        self.nr = nr
+
+    def get_id(self):
+        return self.nr
+
+    def iter_neighbors(self):
+        g = self.graph
+        cache = g.cache
+        for (target, cost, label) in g.successors(self.nr):
+            # same as g.node(target), inlined since this is where searches spend their time
+            node = cache.get(target)
+            if node is None:
+                g.misses += 1
+                node = ImplicitNode(g, target)
+                cache[target] = node
+                if len(cache) > g.cache_size:
+                    cache.popitem(last=False)
+            else:
+                g.hits += 1
+                cache.move_to_end(target)
+            yield ImplicitEdge(self.nr, node, cost, label)
+
+    def get_neighbors(self):
+        return list(self.iter_neighbors())
+
+
+class ImplicitEdge(graph.Edge):
+    """
+    An edge of an ImplicitGraph. The name is formatted from the source id, the label and the target id when it is accessed.
+    """
+    def __init__(self, source, target, cost, label):
+        self.source = source
+        self.target = target
+        self.cost = cost
+        self.label = label
+
+    @property
+    def name(self):
+        return "%s - %s - %s" % (self.source, self.label, self.target.get_id())
+
+
+def inf_successors(nr):
+    """
+    Successor function of the infinite graph of graph.InfNode: every number is connected to its predecessor, its successor,
+    twice its value, and half its value if it is even.
+    """
+    yield (nr - 1, 1, "-1")
+    yield (nr + 1, 1, "+1")
+    yield (nr * 2, 1, "*2")
+    if nr % 2 == 0:
+        yield (nr // 2, 1, "/2")
+
+
+def inf_graph(cache_size=100000):
+    """
+    Returns an ImplicitGraph with the same nodes and edges as graph.InfNode. Use inf_graph()[1] in place of graph.InfNode(1).
+    """
+    return ImplicitGraph(inf_successors, cache_size)
+
+
+def inf_predecessors(nr):
+    """
+    Inverse of inf_successors: returns the (source id, cost, label) triples of all edges that lead to nr.
+    """
+    yield (nr + 1, 1, "-1")
+    yield (nr - 1, 1, "+1")
+    if nr % 2 == 0:
+        yield (nr // 2, 1, "*2")
+    yield (nr * 2, 1, "/2")
+
+
+def inf_reverse_neighbors(node):
+    """
+    Reverse neighbor provider for pathfinding.bidirectional on graph.InfNode and inf_graph() nodes. Returns one edge per
+    incoming edge of node, with the edge's source as target, named like the original edge.
+    """
+    nr = node.get_id()
+    if isinstance(node, ImplicitNode):
+        make = node.graph.node
+    else:
+        make = graph.InfNode
+    return [graph.Edge(make(source), cost, "%d - %s - %d" % (source, label, nr)) for (source, cost, label) in inf_predecessors(nr)]
+
+
+def main():
+    """
+    Compares bfs, greedy and astar on inf_graph(), with the default and a tiny cache, with the same searches on graph.InfNode,
+    and bidirectional search with inf_reverse_neighbors on both.
+    """
+    import pathfinding
+
+    def summary(result):
+        return (result.path.ids() if result.path else [], result.path.names() if result.path else [], result.distance,
+                result.visited, result.expanded, result.status)
+
+    for target in (2, 77, 2050):
+        goal = lambda n: n.get_id() == target
+        heuristic = lambda n: abs(n.get_id() - target)
+        searches = [lambda start, end: pathfinding.bfs(start, goal),
+                    lambda start, end: pathfinding.greedy(start, heuristic, goal),
+                    lambda start, end: pathfinding.astar(start, heuristic, goal),
+                    lambda start, end: pathfinding.bidirectional(start, end, inf_reverse_neighbors, unit_cost=True)]
+        for search in searches:
+            expected = summary(search(graph.InfNode(1), graph.InfNode(target)))
+            for cacheSize in (100000, 5):
+                g = inf_graph(cacheSize)
+                assert summary(search(g[1], g[target])) == expected, (target, cacheSize)
+                assert len(g.cache) <= cacheSize
+    print("inf_graph searches ok")
+
+
+if __name__ == "__main__":
+    main()
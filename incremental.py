@@ -0,0 +1,142 @@
+"""
+Incremental searches. The step generators of pathfinding.py (bfs_steps, greedy_steps, astar_steps and dijkstra_steps), on
+which bfs, greedy, astar and dijkstra are built, yield a SearchEvent after every expansion and when the goal is reached, so
+a caller can watch the search, stop it early, or run it in slices. The final searchstate.SearchResult is the return value
+of the generator (see IncrementalSearch, which keeps track of it), and is the same as the result of the blocking function.
+"""
+import asyncio
+
+from pathfinding import bfs_steps, greedy_steps, astar_steps, dijkstra_steps
+from searchstate import EXPANDED, GOAL
+
+
+class IncrementalSearch:
+    """
+    Drives one of the step generators, and keeps its result once it is done. The search can be advanced a few expansions at
+    a time with advance(), or iterated over to see every event; in both cases it can be paused by simply not continuing,
+    and resumed later.
+    """
+    def __init__(self, steps):
+        self.steps = steps
+        self.result = None
+        self.last = None
+
+    @property
+    def done(self):
+        return self.result is not None
+
+    def __iter__(self):
+        while self.result is None:
+            event = self.next_event()
+            if event is not None:
+                yield event
+
+    def next_event(self):
+        """
+        Runs the search until its next event and returns it, or returns None if the search is done.
+        """
+        if self.result is not None:
+            return None
+        try:
+            self.last = next(self.steps)
+            return self.last
+        except StopIteration as stop:
+            self.result = stop.value
+            return None
+
+    def advance(self, expansions):
+        """
+        Runs the search for up to the given number of expansions. Returns the result if the search is done, otherwise None.
+        """
+        while self.result is None and expansions > 0:
+            event = self.next_event()
+            if event is not None and event.kind == EXPANDED:
+                expansions -= 1
+        return self.result
+
+    def finish(self):
+        """
+        Runs the search to the end and returns its result.
+        """
+        while self.result is None:
+            self.next_event()
+        return self.result
+
+
+async def search_async(steps, every=100):
+    """
+    Runs one of the step generators inside an asyncio event loop, giving other tasks a chance to run after every `every`
+    expansions, and returns the final result. For example:
+        result = await search_async(astar_steps(graph.InfNode(1), heuristic, goal))
+    """
+    search = IncrementalSearch(steps)
+    while search.advance(every) is None:
+        await asyncio.sleep(0)
+    return search.result
+
+
+def main():
+    """
+    Runs the step generators on all pairs of nodes of Austria in slices, event by event and to the end, and checks that
+    every way gives the result of the blocking search. Then runs a Dijkstra search on graph.InfNode with search_async next
+    to another task, which has to get its turns while the search is running.
+    """
+    import random
+    import graph
+    import pathfinding
+
+    def summary(result):
+        return ([n.get_id() for n in result.path], result.distance, result.visited, result.expanded, result.status)
+
+    rng = random.Random(14)
+    nodes = graph.Austria
+    for a in nodes:
+        for b in nodes:
+            goal = lambda n: n.get_id() == b
+            heuristic = lambda n: graph.AustriaHeuristic[b][n.get_id()]
+            searches = [(lambda: bfs_steps(nodes[a], goal), pathfinding.bfs(nodes[a], goal)),
+                        (lambda: greedy_steps(nodes[a], heuristic, goal), pathfinding.greedy(nodes[a], heuristic, goal)),
+                        (lambda: astar_steps(nodes[a], heuristic, goal), pathfinding.astar(nodes[a], heuristic, goal)),
+                        (lambda: astar_steps(nodes[a], pathfinding.default_heuristic, goal),
+                         pathfinding.astar(nodes[a], pathfinding.default_heuristic, goal)),
+                        (lambda: dijkstra_steps(nodes[a], goal), pathfinding.dijkstra(nodes[a], goal))]
+            for (steps, expected) in searches:
+                # paused and resumed every few expansions
+                search = IncrementalSearch(steps())
+                while search.advance(rng.randint(1, 3)) is None:
+                    pass
+                assert summary(search.result) == summary(expected), (a, b)
+                # stopped after one expansion and finished
+                search = IncrementalSearch(steps())
+                search.advance(1)
+                assert summary(search.finish()) == summary(expected), (a, b)
+                # every event
+                search = IncrementalSearch(steps())
+                events = list(search)
+                assert summary(search.result) == summary(expected), (a, b)
+                assert sum(1 for event in events if event.kind == EXPANDED) == expected.expanded, (a, b)
+                assert (events[-1].kind == GOAL) == bool(expected.path), (a, b)
+    print("Austria: paused, resumed and event by event searches ok")
+
+    async def beside(steps):
+        # runs the search next to a task that counts its turns
+        turns = [0]
+
+        async def count():
+            while True:
+                turns[0] += 1
+                await asyncio.sleep(0)
+        task = asyncio.create_task(count())
+        result = await search_async(steps, every=100)
+        task.cancel()
+        return result, turns[0]
+
+    goal = lambda n: n.get_id() == 2050
+    (result, turns) = asyncio.run(beside(dijkstra_steps(graph.InfNode(1), goal)))
+    assert summary(result) == summary(pathfinding.dijkstra(graph.InfNode(1), goal))
+    assert turns > 0 and turns >= result.expanded // 100 - 1, (turns, result.expanded)
+    print("search_async ok: %d expansions, %d turns of the other task" % (result.expanded, turns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import struct
+from array import array
+
+import graph
+from csrgraph import CSRGraph, CSRNode, dijkstra_ids
+
+MAGIC = b"ALTI"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQ")
+
+
+class LandmarkIndex:
+    """
+    Landmark (ALT) heuristic for A* on a finite graph, as an alternative to hand-written tables like graph.AustriaHeuristic.
+
+    A few landmark nodes are picked, and the exact shortest path distances between every node and every landmark are
+    precomputed. By the triangle inequality, |d(L,t) - d(L,v)| is a lower bound for the distance between v and t for every
+    landmark L, so the maximum over all landmarks is an admissible (and consistent) heuristic for any target t. The index
+    takes k*n floats, instead of the n*n entries of a full table.
+
+    The graph is a CSRGraph, or a dictionary of nodes as returned by graph.make_geom_graph. These graphs are symmetric, so the
+    distances to and from a landmark are the same and only stored once.
+    """
+    def __init__(self, g, k=8):
+        if not isinstance(g, CSRGraph):
+            g = CSRGraph.from_geom_graph(g)
+        self.graph = g
+        self.landmarks = array("q")
+        # distances of all nodes to landmark i are stored at positions i*n to (i+1)*n-1
+        self.distances = array("d")
+        n = len(g)
+        if n == 0:
+            return
+        inf = float("inf")
+        # farthest point selection: start from the node farthest from node 0, then always add the node whose distance to
+        # the closest landmark so far is largest, preferring nodes that none of the landmarks can reach
+        closest = dijkstra_ids(g, 0)
+        while len(self.landmarks) < min(k, n):
+            best = max(range(n), key=lambda i: (closest[i] == inf, closest[i]))
+            if best in self.landmarks:
+                break
+            dist = dijkstra_ids(g, best)
+            if len(self.landmarks) == 0:
+                closest = dist
+            else:
+                closest = array("d", map(min, closest, dist))
+            self.landmarks.append(best)
+            self.distances.extend(dist)
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    def bound_ids(self, v, t):
+        """
+        Returns the largest lower bound on the distance between the nodes with numbers v and t given by the landmarks.
+        """
+        n = len(self.graph)
+        d = self.distances
+        result = 0
+        for i in range(len(self.landmarks)):
+            dv = d[i * n + v]
+            dt = d[i * n + t]
+            if dv == dt:
+                continue
+            # nodes in different components are infinitely far apart
+            bound = abs(dv - dt)
+            if bound > result:
+                result = bound
+        return result
+
+    def heuristic_ids(self, target):
+        """
+        Returns a heuristic function of node numbers for the target node number, for use with csrgraph.astar_ids.
+        """
+        n = len(self.graph)
+        d = self.distances
+        # (offset of the landmark's distances, distance of the landmark to the target), the distances are not copied
+        landmarks = [(i * n, d[i * n + target]) for i in range(len(self.landmarks))]
+
+        def heuristic(v):
+            result = 0
+            for (offset, dt) in landmarks:
+                dv = d[offset + v]
+                if dv != dt:
+                    bound = abs(dv - dt)
+                    if bound > result:
+                        result = bound
+            return result
+        return heuristic
+
+    def heuristic(self, target):
+        """
+        Returns a heuristic function for pathfinding.astar and greedy that estimates the distance to target. target can be a
+        node or a node id, the heuristic can be passed the nodes of the graph the index was built from, or their CSRGraph
+        counterparts.
+        """
+        if isinstance(target, graph.Node):
+            target = target.get_id()
+        index = self.graph.index
+        byNumber = self.heuristic_ids(index[target])
+
+        def heuristic(node):
+            if isinstance(node, CSRNode):
+                return byNumber(node.nr)
+            return byNumber(index[node.get_id()])
+        return heuristic
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self.landmarks), len(self.graph)))
+            array("q", self.landmarks).tofile(f)
+            array("d", self.distances).tofile(f)
+
+    @classmethod
+    def load(cls, path, g):
+        """
+        Loads an index written by save. g has to be the graph the index was built from, with the nodes in the same order.
+        """
+        if not isinstance(g, CSRGraph):
+            g = CSRGraph.from_geom_graph(g)
+        result = cls.__new__(cls)
+        result.graph = g
+        with open(path, "rb") as f:
+            (magic, version, k, n) = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("%s is not a version %d landmark index" % (path, VERSION))
+            if n != len(g):
+                raise ValueError("%s was built for a graph with %d nodes, not %d" % (path, n, len(g)))
+            result.landmarks = array("q")
+            result.landmarks.fromfile(f, k)
+            result.distances = array("d")
+            result.distances.fromfile(f, k * n)
+        return result
+
+
+def main():
+    """
+    Compares A* with the default heuristic, the hand-written heuristic tables and landmark heuristics on Austria and TestCase.
+    """
+    import pathfinding
+
+    for (name, nodes, table) in [("Austria", graph.Austria, graph.AustriaHeuristic), ("TestCase", graph.TestCase, graph.TestCaseHeuristic)]:
+        index = LandmarkIndex(nodes, 4)
+        totals = {"default": 0, "table": 0, "landmarks": 0}
+        for start in nodes:
+            for target in nodes:
+                goal = lambda n: n.get_id() == target
+                heuristics = {"default": pathfinding.default_heuristic,
+                              "table": lambda n: table[target][n.get_id()],
+                              "landmarks": index.heuristic(target)}
+                for (kind, heuristic) in heuristics.items():
+                    result = pathfinding.astar(nodes[start], heuristic, goal)
+                    totals[kind] += result[3]
+                    if kind != "table":
+                        assert result[1] == pathfinding.astar(nodes[start], pathfinding.default_heuristic, goal)[1]
+        print(name, "landmarks:", [index.graph.names[i] for i in index.landmarks])
+        for (kind, expanded) in totals.items():
+            print("    expanded nodes over all queries with %s heuristic: %d" % (kind, expanded))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Memoized:
+    """
+    Wraps a heuristic or goal predicate and remembers its results by node id, so that it is only evaluated once per node even
+    if the node is generated many times, as with graph.InfNode, whose nodes are not cached. At most max_size results are kept,
+    the least recently used ones are evicted first.
+
+    If batch is given, it is a function that takes a list of node ids and returns the list of results for them. The searches
+    in pathfinding.py then call prefetch with all neighbors of an expanded node, so that the results for the neighbors that are
+    not cached yet are computed with a single call of batch (e.g. with NumPy, see abs_difference).
+
+    hits and misses count the lookups that were and were not answered from the cache, batched and batch_calls the results
+    that were computed by prefetch, and the number of calls of batch for them.
+    """
+    def __init__(self, fn, max_size=100000, batch=None):
+        self.fn = fn
+        self.max_size = max_size
+        self.batch = batch
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.batched = 0
+        self.batch_calls = 0
+        if batch is None:
+            # nothing to prefetch, the searches skip prefetching if this is None
+            self.prefetch = None
+
+    def __call__(self, node):
+        nid = node.get_id()
+        cache = self.cache
+        if nid in cache:
+            self.hits += 1
+            cache.move_to_end(nid)
+            return cache[nid]
+        self.misses += 1
+        result = self.fn(node)
+        cache[nid] = result
+        if len(cache) > self.max_size:
+            cache.popitem(last=False)
+        return result
+
+    def prefetch(self, nodes):
+        """
+        Computes the results for all nodes that are not cached yet with one call of the batch function.
+        """
+        cache = self.cache
+        missing = []
+        for node in nodes:
+            nid = node.get_id()
+            if nid not in cache and nid not in missing:
+                missing.append(nid)
+        if not missing:
+            return
+        self.batched += len(missing)
+        self.batch_calls += 1
+        for (nid, result) in zip(missing, self.batch(missing)):
+            cache[nid] = result
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+
+    def clear(self):
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+        self.batched = 0
+        self.batch_calls = 0
+
+    def as_dict(self):
+        """
+        Exports the cache statistics as a flat dictionary.
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "batched": self.batched, "batch_calls": self.batch_calls,
+                "size": len(self.cache), "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+def memoize(fn, max_size=100000, batch=None):
+    """
+    Returns a Memoized wrapper around the heuristic or goal predicate fn.
+    """
+    return Memoized(fn, max_size, batch)
+
+
+def abs_difference(target, max_size=100000):
+    """
+    Memoized heuristic |id - target| for graphs whose node ids are numbers, like graph.InfNode (the infheuristic of
+    pathfinding.main). Batches of ids are evaluated with NumPy if it is installed and the ids fit into 64 bit integers.
+    """
+    def single(node):
+        return abs(node.get_id() - target)
+
+    def batch(ids):
+        if numpy is not None and abs(target) < 2 ** 62 and all(abs(i) < 2 ** 62 for i in ids):
+            return numpy.abs(numpy.array(ids, dtype=numpy.int64) - target).tolist()
+        return [abs(i - target) for i in ids]
+    return Memoized(single, max_size, batch)
+
+
+def main():
+    """
+    Checks that astar and greedy on graph.InfNode give the same results with memoized heuristics and goals as with the plain
+    functions, with and without batches, and that the batches of abs_difference are computed correctly both with NumPy (if
+    it is installed) and with the pure Python fallback.
+    """
+    global numpy
+    import graph
+    import pathfinding
+
+    def summary(result):
+        return ([n.get_id() for n in result.path], result.distance, result.visited, result.expanded, result.status)
+
+    installed = numpy
+    for useNumpy in ([True, False] if installed is not None else [False]):
+        numpy = installed if useNumpy else None
+        for target in (2050, 20050):
+            plain = lambda n: abs(n.get_id() - target)
+            goal = lambda n: n.get_id() == target
+            for search in (pathfinding.astar, pathfinding.greedy):
+                expected = summary(search(graph.InfNode(1), plain, goal))
+                memoized = memoize(plain)
+                assert memoized.prefetch is None
+                assert summary(search(graph.InfNode(1), memoized, memoize(goal))) == expected, (search.__name__, target)
+                batched = abs_difference(target)
+                assert summary(search(graph.InfNode(1), batched, goal)) == expected, (search.__name__, target)
+                # every node is evaluated once, and all but the start in batches
+                assert memoized.misses == len(memoized.cache), (search.__name__, target)
+                assert batched.misses == 1 and batched.batch_calls > 0, (search.__name__, target, batched.as_dict())
+        # ids that do not fit into 64 bit integers always take the fallback
+        for (target, ids) in [(7, [-3, 0, 7, 12]), (2 ** 63, [2 ** 63 - 5, 2 ** 63 + 5, 2 ** 64])]:
+            assert abs_difference(target).batch(ids) == [abs(i - target) for i in ids], (target, ids)
+        print("memoized heuristics ok", "with NumPy" if numpy is not None else "without NumPy")
+    numpy = installed
+
+
+if __name__ == "__main__":
+    main()
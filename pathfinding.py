@@ -1,4 +1,15 @@
+from collections import OrderedDict, deque
+from heapq import heappush, heappop
+
 import graph
+import implicitgraph
+from csrgraph import CSRNode
+from frontier import PriorityFrontier
+from searchstate import (Path, SearchCounters, SearchEvent, SearchState, SearchLimits, SearchResult, EXPANDED, GOAL,
+                         LIMIT_HIT, EXHAUSTED)
+
+# Nodes of graphs in which every edge has a reverse edge with the same cost, see bidirectional
+SYMMETRIC_NODES = (graph.GeomNode, CSRNode)
 
 
 def default_heuristic(n):
@@ -8,7 +19,7 @@ def default_heuristic(n):
     return 0
 
 
-def bfs(start, goal):
+def bfs(start, goal, limits=None, stats=None):
     """
     Breadth-First search algorithm. The function is passed a start graph.Node object and a goal predicate.
     
@@ -17,67 +28,72 @@ def bfs(start, goal):
     The goal is represented as a function, that is passed a node, and returns True if that node is a goal node, otherwise False. 
     
     The function should return a 4-tuple (path,distance,visited,expanded):
-        - path is a sequence of graph.Edge objects that have to be traversed to reach a goal state from the start
+        - path is a sequence of the nodes from the start to a goal state (a searchstate.Path, whose edges() are the graph.Edge
+          objects that have to be traversed to reach the goal state from the start)
         - distance is the sum of costs of all edges in the path 
         - visited is the total number of nodes that were added to the frontier during the execution of the algorithm 
         - expanded is the total number of nodes that were expanded, i.e. removed from the frontier to add their neighbors
+
+    The optional limits is a searchstate.SearchLimits object that bounds the size of the frontier, the number of expansions, the
+    running time and the memory of the search. The result is a searchstate.SearchResult, whose status tells whether a path was
+    found, the graph was exhausted, or a limit was hit (and which one).
+
+    The optional stats is a searchstats.SearchStats object that counts and times the phases of the search.
     """
+    return _finish(bfs_steps(start, goal, limits, stats, events=False))
 
-    # Set of arrays needed for the implementations
-    nodeList = []
-    expanded = []
-    visited = []
 
-    # Using a dictionary to store nodes and its value
-    nodeDict = {}
+def bfs_steps(start, goal, limits=None, stats=None, events=True):
+    """
+    Breadth-first search as a generator that yields a searchstate.SearchEvent after every expansion, with the depth of the
+    expanded node, and when the goal is reached, and returns the result of bfs (see incremental.py). With events=False it
+    yields nothing and runs to the end on the first next(), without creating any events; bfs runs it that way.
+    """
 
-    # Start the list with the start node
-    nodeList.append(start)
-    visited.append(start)
+    # Closed set and parent map, keyed by node id
+    state = SearchState(start, limits)
 
-    # Set an empty array for the path
-    path = []
-    # Set the distance to 0
-    distance = 0
+    # Start the list with the start node, after attaching the stats so that its push is counted like the others
+    nodeList = deque()
+    if stats is not None:
+        nodeList, goal, _ = stats.attach(state, nodeList, goal)
+    nodeList.append(start)
+    # The nodes of one depth are in the list right after each other, levelLeft counts those of the current depth
+    depth = 0
+    levelLeft = 1
 
     # Run until it reaches the destination
     while len(nodeList) > 0:
+        # Stop if the search ran into one of its limits
+        if state.exceeded(len(nodeList)):
+            return state.result()
         # pop the next node in the list and make it current
-        currentNode = nodeList.pop(0)
-        # Take current node and add to expanded
-        expanded.append(currentNode)
-        # Get all the neighbors of the current node
-        neighbors = currentNode.get_neighbors()
+        currentNode = nodeList.popleft()
+        # Take current node, count it as expanded and get all of its neighbors
+        neighbors = state.expand(currentNode)
+        if events:
+            if levelLeft == 0:
+                # all nodes left in the list are one level deeper
+                depth += 1
+                levelLeft = len(nodeList) + 1
+            levelLeft -= 1
+            yield SearchEvent(EXPANDED, currentNode, depth)
         # Run through all the neighbors
-        for neighbor in neighbors:
-            # Checks if the next neighbor node is visited
-            if neighbor.target not in visited:
-                # Put neighbor node in visited
-                visited.append(neighbor.target)
-                # Set the current node with its value to a variable
-                nodeEntry = [currentNode, neighbor.cost]
-                # Add the next current node to the dictionary
-                nodeDict[neighbor.target.get_id()] = nodeEntry
+        for index, neighbor in enumerate(neighbors):
+            # Put neighbor node in visited, unless it was visited before
+            if state.visit(neighbor.target, currentNode, neighbor.cost, index):
                 # Check if the neighbor node is our goal
                 if goal(neighbor.target):
-                    # add the goal to the path
-                    path.insert(0, neighbor.target)
-                    n = neighbor.target
-                    # Run until the goal is our current node
-                    while n != start:
-                        currentEntry = nodeDict[n.get_id()]
-                        path.insert(0, currentEntry[0])
-                        distance = distance + currentEntry[1]
-                        n = currentEntry[0]
-                    nodeList = []
-                    break
-                else:
-                    nodeList.append(neighbor.target)
+                    result = state.result(neighbor.target)
+                    if events:
+                        yield SearchEvent(GOAL, neighbor.target, result.distance)
+                    return result
+                nodeList.append(neighbor.target)
 
-    return path, distance, len(visited), len(expanded)
+    return state.result()
 
 
-def dfs(start, goal):
+def dfs(start, goal, limits=None, stats=None):
     """
     Depth-First search algorithm. The function is passed a start graph.Node object, a heuristic function, and a goal predicate.
     
@@ -86,53 +102,40 @@ def dfs(start, goal):
     The goal is represented as a function, that is passed a node, and returns True if that node is a goal node, otherwise False. 
     
     The function should return a 4-tuple (path,distance,visited,expanded):
-        - path is a sequence of graph.Edge objects that have to be traversed to reach a goal state from the start
+        - path is a sequence of the nodes from the start to a goal state (a searchstate.Path, whose edges() are the graph.Edge
+          objects that have to be traversed to reach the goal state from the start)
         - distance is the sum of costs of all edges in the path 
         - visited is the total number of nodes that were added to the frontier during the execution of the algorithm 
         - expanded is the total number of nodes that were expanded, i.e. removed from the frontier to add their neighbors
-    """
-    nodeList = []
-    expanded = []
-    visited = []
 
-    nodeDict = {}
+    The optional limits is a searchstate.SearchLimits object that bounds the size of the frontier, the number of expansions, the
+    running time and the memory of the search. The result is a searchstate.SearchResult, whose status tells whether a path was
+    found, the graph was exhausted, or a limit was hit (and which one).
 
-    nodeList.append(start)
-    visited.append(start)
+    The optional stats is a searchstats.SearchStats object that counts and times the phases of the search.
+    """
+    state = SearchState(start, limits)
 
-    path = []
-    distance = 0
+    nodeList = []
+    if stats is not None:
+        nodeList, goal, _ = stats.attach(state, nodeList, goal)
+    nodeList.append(start)
 
     while len(nodeList) > 0:
-        currentNode = nodeList.pop(0)
-        expanded.append(currentNode)
-        neighbors = currentNode.get_neighbors()
-        for neighbor in neighbors:
-            if neighbor.target not in visited:
-                visited.append(neighbor.target)
-                nodeEntry = [currentNode, neighbor.cost]
-                nodeDict[neighbor.target.get_id()] = nodeEntry
+        if state.exceeded(len(nodeList)):
+            return state.result()
+        currentNode = nodeList.pop()
+        neighbors = state.expand(currentNode)
+        for index, neighbor in enumerate(neighbors):
+            if state.visit(neighbor.target, currentNode, neighbor.cost, index):
                 if goal(neighbor.target):
-                    path.insert(0, neighbor.target)
-                    n = neighbor.target
-                    while n != start:
-                        currentEntry = nodeDict[n.get_id()]
-                        path.insert(0, currentEntry[0])
-                        distance = distance + currentEntry[1]
-                        n = currentEntry[0]
-                    nodeList = []
-                    break
-                else:
-                    nodeList.insert(0, neighbor.target)
-                    if len(nodeList) > 15000:
-                        print("Max stack size exceeded")
-                        nodeList = []
-                        break
-
-    return path, distance, len(visited), len(expanded)
-
-
-def greedy(start, heuristic, goal):
+                    return state.result(neighbor.target)
+                nodeList.append(neighbor.target)
+
+    return state.result()
+
+
+def greedy(start, heuristic, goal, limits=None, stats=None):
     """
     Greedy search algorithm. The function is passed a start graph.Node object, a heuristic function, and a goal predicate.
 
@@ -143,75 +146,69 @@ def greedy(start, heuristic, goal):
     The goal is also represented as a function, that is passed a node, and returns True if that node is a goal node, otherwise False.
 
     The function should return a 4-tuple (path,distance,visited,expanded):
-        - path is a sequence of graph.Edge objects that have to be traversed to reach a goal state from the start
+        - path is a sequence of the nodes from the start to a goal state (a searchstate.Path, whose edges() are the graph.Edge
+          objects that have to be traversed to reach the goal state from the start)
         - distance is the sum of costs of all edges in the path
         - visited is the total number of nodes that were added to the frontier during the execution of the algorithm
         - expanded is the total number of nodes that were expanded, i.e. removed from the frontier to add their neighbors
+
+    The optional limits is a searchstate.SearchLimits object that bounds the size of the frontier, the number of expansions, the
+    running time and the memory of the search. The result is a searchstate.SearchResult, whose status tells whether a path was
+    found, the graph was exhausted, or a limit was hit (and which one).
+
+    The optional stats is a searchstats.SearchStats object that counts and times the phases of the search.
     """
+    return _finish(greedy_steps(start, heuristic, goal, limits, stats, events=False))
 
-    # Set of arrays needed for the implementations
-    nodeList = []
-    expanded = []
-    visited = []
 
-    # Using a dictionary to store nodes and its value
-    nodeDict = {}
+def greedy_steps(start, heuristic, goal, limits=None, stats=None, events=True):
+    """
+    Greedy search as a generator that yields a searchstate.SearchEvent after every expansion, with the heuristic value of the
+    expanded node, and when the goal is reached, and returns the result of greedy (see incremental.py). events is the same
+    as for bfs_steps.
+    """
 
-    # Start the list with the start node and heuristic
-    nodeList.append((start, heuristic(start)))
-    visited.append(start)
+    # Closed set and parent map, keyed by node id
+    state = SearchState(start, limits)
 
-    # Set an empty array for the path
-    path = []
-    # Set the distance to 0
-    distance = 0
+    # Start the frontier with the start node, ordered by the value of the heuristic
+    nodeList = PriorityFrontier()
+    # Heuristics that can evaluate many nodes at once (see memo.Memoized) get all neighbors of a node in one call
+    prefetch = getattr(heuristic, "prefetch", None)
+    if stats is not None:
+        nodeList, goal, heuristic = stats.attach(state, nodeList, goal, heuristic)
+    nodeList.push(start.get_id(), start, heuristic(start))
 
     # Run until it reaches the destination
     while len(nodeList) > 0:
-        # pop the next node in the list and make it current
-        currentNode = nodeList.pop(0)
-        # Take current node and add to expanded
-        expanded.append(currentNode)
-        # Get all the neighbors of the current node
-        neighbors = currentNode[0].get_neighbors()
+        # Stop if the search ran into one of its limits
+        if state.exceeded(len(nodeList)):
+            return state.result()
+        # pop the node with the lowest heuristic value and make it current
+        currentNode, h = nodeList.pop()
+        # Take current node, count it as expanded and get all of its neighbors
+        neighbors = state.expand(currentNode)
+        if events:
+            yield SearchEvent(EXPANDED, currentNode, h)
+        if prefetch is not None:
+            neighbors = list(neighbors)
+            prefetch([neighbor.target for neighbor in neighbors])
         # Run through all the neighbors
-        for neighbor in neighbors:
-            # Checks if the next neighbor node is visited
-            if neighbor.target not in visited:
-                # Put neighbor node in visited
-                visited.append(neighbor.target)
-                # (modified) Set the current node with its value to a variable
-                nodeEntry = [currentNode[0], neighbor.cost]
-                # Add the next current node to the dictionary
-                nodeDict[neighbor.target.get_id()] = nodeEntry
+        for index, neighbor in enumerate(neighbors):
+            # Put neighbor node in visited, unless it was visited before
+            if state.visit(neighbor.target, currentNode, neighbor.cost, index):
                 # Check if the neighbor node is our goal
-
                 if goal(neighbor.target):
-                    # add the goal to the path
-                    path.insert(0, neighbor.target)
-                    n = neighbor.target
-                    # Run until the goal is our current node
-                    while n != start:
-                        currentEntry = nodeDict[n.get_id()]
-                        path.insert(0, currentEntry[0])
-                        distance = distance + currentEntry[1]
-                        n = currentEntry[0]
-                        nodeList = []
-                    break
-                else:
-                    # (modified)
-                    nodeList.append((neighbor.target, heuristic(neighbor.target)))
-                    if len(nodeList) > 15000:
-                        nodeList = []
-                        break
-
-        # (new) Sort list by the value of heuristics in ascending order.
-        nodeList.sort(key=lambda a: a[1])
-
-    return path, distance, len(visited), len(expanded)
-
-
-def astar(start, heuristic, goal):
+                    result = state.result(neighbor.target)
+                    if events:
+                        yield SearchEvent(GOAL, neighbor.target, result.distance)
+                    return result
+                nodeList.push(neighbor.target.get_id(), neighbor.target, heuristic(neighbor.target))
+
+    return state.result()
+
+
+def astar(start, heuristic, goal, limits=None, stats=None):
     """
     A* search algorithm. The function is passed a start graph.Node object, a heuristic function, and a goal predicate.
 
@@ -222,97 +219,416 @@ def astar(start, heuristic, goal):
     The goal is also represented as a function, that is passed a node, and returns True if that node is a goal node, otherwise False.
 
     The function should return a 4-tuple (path,distance,visited,expanded):
-        - path is a sequence of graph.Edge objects that have to be traversed to reach a goal state from the start
+        - path is a sequence of the nodes from the start to a goal state (a searchstate.Path, whose edges() are the graph.Edge
+          objects that have to be traversed to reach the goal state from the start)
         - distance is the sum of costs of all edges in the path
         - visited is the total number of nodes that were added to the frontier during the execution of the algorithm
         - expanded is the total number of nodes that were expanded, i.e. removed from the frontier to add their neighbors
+
+    The optional limits is a searchstate.SearchLimits object that bounds the size of the frontier, the number of expansions, the
+    running time and the memory of the search. The result is a searchstate.SearchResult, whose status tells whether a path was
+    found, the graph was exhausted, or a limit was hit (and which one).
+
+    The optional stats is a searchstats.SearchStats object that counts and times the phases of the search.
+
+    With the default heuristic, A* is the same as Dijkstra's algorithm, and the search is handed to dijkstra, which finds the
+    same path with the same counts without calling the heuristic.
     """
-    # Set of arrays needed for the implementations
-    nodeList = []
-    expanded = []
-    visited = []
+    return _finish(astar_steps(start, heuristic, goal, limits, stats, events=False))
 
-    # Using a dictionary to store nodes and its value
-    nodeDict = {}
 
-    # Start the list with the start node and heuristic
-    nodeList.append((start, heuristic(start)))
-    visited.append(start)
+def astar_steps(start, heuristic, goal, limits=None, stats=None, events=True):
+    """
+    A* search as a generator that yields a searchstate.SearchEvent after every expansion, with the f value of the expanded
+    node, which never decreases if the heuristic is consistent, and when the goal is reached, and returns the result of
+    astar (see incremental.py). With the default heuristic, the events are those of dijkstra_steps. events is the same as
+    for bfs_steps.
+    """
+    if heuristic is default_heuristic:
+        return (yield from dijkstra_steps(start, goal, limits, stats, events=events))
 
-    # Set an empty array for the path
-    path = []
-    # Set the distance to 0
-    distance = 0
+    # Closed set, parent map and best known path cost, keyed by node id
+    state = SearchState(start, limits)
 
-    # (new) Sort list by the value of heuristics in ascending order.
-    nodeList.sort(key=lambda a: a[1])
+    # Start the frontier with the start node, ordered by f = g + h. A node that is reached again over a cheaper path
+    # replaces its old frontier entry.
+    nodeList = PriorityFrontier(lazy=True)
+    # Heuristics that can evaluate many nodes at once (see memo.Memoized) get all neighbors of a node in one call
+    prefetch = getattr(heuristic, "prefetch", None)
+    if stats is not None:
+        nodeList, goal, heuristic = stats.attach(state, nodeList, goal, heuristic)
+    nodeList.push(start.get_id(), start, heuristic(start))
 
     # Run until it reaches the destination
     while len(nodeList) > 0:
-        # pop the next node in the list and make it current
-        currentNode = nodeList.pop(0)
-        # Take current node and add to expanded
-        expanded.append(currentNode)
-        # Get all the neighbors of the current node
-        neighbors = currentNode[0].get_neighbors()
+        # Stop if the search ran into one of its limits
+        if state.exceeded(len(nodeList)):
+            return state.result()
+        # pop the node with the lowest f value and make it current
+        currentNode, f = nodeList.pop()
+        # The goal test happens on expansion, so that the first goal found is reached over the cheapest path
+        if goal(currentNode):
+            result = state.result(currentNode)
+            if events:
+                yield SearchEvent(GOAL, currentNode, result.distance)
+            return result
+        g = state.cost(currentNode)
+        # Take current node, count it as expanded and get all of its neighbors
+        neighbors = state.expand(currentNode)
+        if events:
+            yield SearchEvent(EXPANDED, currentNode, f)
+        if prefetch is not None:
+            neighbors = list(neighbors)
+            prefetch([neighbor.target for neighbor in neighbors])
         # Run through all the neighbors
-        for neighbor in neighbors:
-            # Checks if the next neighbor node is visited
-            if neighbor.target not in visited:
-                # Put neighbor node in visited
-                visited.append(neighbor.target)
-                # (modified) Set the current node with its value to a variable
-                nodeEntry = [currentNode[0], neighbor.cost]
-                # Add the next current node to the dictionary
-                nodeDict[neighbor.target.get_id()] = nodeEntry
-                # Check if the neighbor node is our goal
+        for index, neighbor in enumerate(neighbors):
+            newCost = g + neighbor.cost
+            # Record the neighbor if it is new or reached over a cheaper path than before
+            if state.relax(neighbor.target, currentNode, neighbor.cost, newCost, index):
+                nodeList.push(neighbor.target.get_id(), neighbor.target, newCost + heuristic(neighbor.target))
 
-                if goal(neighbor.target):
-                    # add the goal to the path
-                    path.insert(0, neighbor.target)
-                    n = neighbor.target
-                    # Run until the goal is our current node
-                    while n != start:
-                        currentEntry = nodeDict[n.get_id()]
-                        path.insert(0, currentEntry[0])
-                        distance = distance + currentEntry[1]
-                        n = currentEntry[0]
-                        nodeList = []
-                    break
-                else:
-                    # (modified)
-                    nodeList.append((neighbor.target, heuristic(neighbor.target)))
-                    if len(nodeList) > 15000:
-                        nodeList = []
-                        break
-
-    return path, distance, len(visited), len(expanded)
-
-
-def run_all(name, start, heuristic, goal):
+    return state.result()
+
+
+def dijkstra(start, goal=None, limits=None, stats=None, tree=False):
+    """
+    Uniform-cost search (Dijkstra's algorithm). The function is passed a start graph.Node object and a goal predicate, and
+    returns the cheapest path to a goal node, as a searchstate.SearchResult like the other searches. Unlike bfs, it takes
+    the costs of the edges into account, and unlike astar, it does not call a heuristic.
+
+    The frontier is a plain binary heap of (g, counter, node) entries. A node that is reached over a cheaper path gets a new
+    entry, and the old one is skipped when it reaches the top of the heap. The goal test happens when a node is taken from
+    the heap, so the search stops as soon as the first goal node is settled. Without a goal, it runs until the whole graph
+    reachable from the start (or as much as the limits allow) is settled.
+
+    With tree=True, the result also has the shortest path tree from the start: result.distances maps the ids of all settled
+    nodes to their distance from the start, and result.tree is the parent map of the search, so that
+    searchstate.Path(result.tree, node) is the shortest path to any node in distances.
+
+    The optional limits and stats are the same as for astar.
+    """
+    return _finish(dijkstra_steps(start, goal, limits, stats, tree, events=False))
+
+
+def dijkstra_steps(start, goal=None, limits=None, stats=None, tree=False, events=True):
+    """
+    Dijkstra's algorithm as a generator that yields a searchstate.SearchEvent after every expansion, with the distance of the
+    expanded node from the start, and when the goal is reached, and returns the result of dijkstra (see incremental.py).
+    events is the same as for bfs_steps.
+    """
+    state = SearchState(start, limits)
+    g = state.g
+    settled = {} if tree else None
+    push = heappush
+    pop = heappop
+    # the frontier holds every visited node that has not been expanded yet, plus stale entries
+    checked = limits is not None or stats is not None
+    if stats is not None:
+        _, goal, _ = stats.attach(state, None, goal)
+        onPush = None if stats.on_push is None else lambda heap, entry: stats.on_push(entry[2])
+        push = stats.timed("push", heappush, onPush)
+        pop = stats.timed("pop", heappop)
+    nodeList = []
+    push(nodeList, (0, 0, start))
+    counter = 1
+    result = None
+
+    while nodeList:
+        # Stop if the search ran into one of its limits
+        if checked and state.exceeded(state.visited - state.expanded):
+            result = state.result()
+            break
+        cost, _, currentNode = pop(nodeList)
+        nid = currentNode.get_id()
+        # Skip entries for nodes that were reached over a cheaper path after they were pushed
+        if cost > g[nid]:
+            continue
+        if tree:
+            settled[nid] = cost
+        if goal is not None and goal(currentNode):
+            result = state.result(currentNode)
+            if events:
+                yield SearchEvent(GOAL, currentNode, result.distance)
+            break
+        neighbors = state.expand(currentNode)
+        if events:
+            yield SearchEvent(EXPANDED, currentNode, cost)
+        for index, neighbor in enumerate(neighbors):
+            newCost = cost + neighbor.cost
+            if state.relax(neighbor.target, currentNode, neighbor.cost, newCost, index):
+                push(nodeList, (newCost, counter, neighbor.target))
+                counter += 1
+
+    if result is None:
+        result = state.result()
+    if tree:
+        result.distances = settled
+        result.tree = state.parents
+    return result
+
+
+def _finish(steps):
+    # runs one of the step generators above to the end and returns its result; the blocking searches pass generators
+    # created with events=False, which finish on the first next()
+    try:
+        while True:
+            next(steps)
+    except StopIteration as stop:
+        return stop.value
+
+
+# The single-direction searches by name, all called as (start, heuristic, goal, limits), for the tools that pick a search
+# by name, like benchmark.py and querycache.py
+ALGORITHMS = {
+    "bfs": lambda start, heuristic, goal, limits: bfs(start, goal, limits),
+    "dfs": lambda start, heuristic, goal, limits: dfs(start, goal, limits),
+    "greedy": lambda start, heuristic, goal, limits: greedy(start, heuristic, goal, limits),
+    "astar": lambda start, heuristic, goal, limits: astar(start, heuristic, goal, limits),
+    "dijkstra": lambda start, heuristic, goal, limits: dijkstra(start, goal, limits),
+}
+
+
+def bidirectional(start, target, reverse=None, heuristic=None, reverse_heuristic=None, unit_cost=False, limits=None, stats=None):
+    """
+    Bidirectional search from the start node to a single known target node. One frontier grows forward from the start, a
+    second one backward from the target, until they meet in the middle.
+
+    reverse is a function that is passed a node and returns its incoming edges, as a list of graph.Edge objects whose target is
+    the source of the original edge. It can be omitted for graphs built with graph.make_geom_graph or csrgraph.CSRGraph,
+    whose edges always come in pairs, so that the incoming edges are the outgoing ones. For implicit graphs it has to be
+    supplied, e.g. implicitgraph.inf_reverse_neighbors for graph.InfNode.
+
+    Three modes are supported:
+        - with unit_cost=True, edges are counted instead of summing their costs (bidirectional breadth-first search)
+        - by default, the search is a bidirectional Dijkstra search
+        - with a heuristic (estimate of the distance to the target) and optionally a reverse_heuristic (estimate of the
+          distance from the start), the frontiers are ordered by the average of the two, which makes a bidirectional A*
+          search. Both heuristics have to be consistent for the path to be optimal.
+    The search stops once the smallest keys of the two frontiers add up to at least the length of the best path found so
+    far, at which point no shorter path can exist.
+
+    Returns a searchstate.SearchResult, like the other searches; visited and expanded count the nodes of both directions. The
+    limits apply to each of the two directions separately, each with its own frontier. If a limit stops the search after
+    the frontiers have met, the best path found so far is returned with status LIMIT_HIT, as it may not be the shortest one.
+    The optional stats is a searchstats.SearchStats object, with the
+    potential (the averaged heuristic) counted as heuristic calls.
+    """
+    if reverse is None:
+        if not isinstance(start, SYMMETRIC_NODES):
+            raise ValueError("bidirectional search on %s nodes needs a reverse neighbor provider" % type(start).__name__)
+        reverse = lambda n: n.get_neighbors()
+    if heuristic is None:
+        potential = None
+    else:
+        if reverse_heuristic is None:
+            reverse_heuristic = default_heuristic
+        potential = lambda n: (heuristic(n) - reverse_heuristic(n)) / 2
+
+    # One closed set, parent map and frontier per direction. In the backward state, the parent of a node is the next node
+    # on its path to the target.
+    forward = SearchState(start, limits)
+    backward = SearchState(target, limits)
+    forwardList = PriorityFrontier(lazy=True)
+    backwardList = PriorityFrontier(lazy=True)
+    if stats is not None:
+        forwardList, _, _ = stats.attach(forward, forwardList)
+        backwardList, _, potential = stats.attach(backward, backwardList, None, potential, False)
+        reverse = stats.timed("expand", reverse, stats.on_expand)
+    forwardList.push(start.get_id(), start, potential(start) if potential else 0)
+    backwardList.push(target.get_id(), target, -potential(target) if potential else 0)
+
+    # Length of the best path found so far, and the node where its two halves meet
+    best = float("inf")
+    meeting = None
+    if start == target:
+        best = 0
+        meeting = start
+
+    while len(forwardList) > 0 and len(backwardList) > 0:
+        # No path through the frontiers can be shorter than the best one found so far
+        if forwardList.peek_priority() + backwardList.peek_priority() >= best:
+            break
+        if forward.exceeded(len(forwardList)) or backward.exceeded(len(backwardList)):
+            break
+
+        # Grow the smaller frontier
+        if len(forwardList) <= len(backwardList):
+            (state, other, nodeList, neighbors, sign) = (forward, backward, forwardList, None, 1)
+        else:
+            (state, other, nodeList, neighbors, sign) = (backward, forward, backwardList, reverse, -1)
+        currentNode, _ = nodeList.pop()
+        g = state.cost(currentNode)
+        if neighbors is None:
+            edges = state.expand(currentNode)
+        else:
+            state.expanded += 1
+            edges = neighbors(currentNode)
+        for index, edge in enumerate(edges):
+            newCost = g + (1 if unit_cost else edge.cost)
+            if state.relax(edge.target, currentNode, edge.cost, newCost, index):
+                key = newCost + sign * potential(edge.target) if potential else newCost
+                nodeList.push(edge.target.get_id(), edge.target, key)
+                # Check if the two searches meet at this node
+                otherCost = other.g.get(edge.target.get_id())
+                if otherCost is not None and newCost + otherCost < best:
+                    best = newCost + otherCost
+                    meeting = edge.target
+
+    visited = forward.visited + backward.visited
+    expanded = forward.expanded + backward.expanded
+    limit = forward.limit or backward.limit
+    if meeting is None:
+        return SearchResult([], 0, visited, expanded, LIMIT_HIT if limit else EXHAUSTED, limit)
+    path = Path(forward.parents, meeting, backward.parents)
+    if limit:
+        return SearchResult(path, path.distance, visited, expanded, LIMIT_HIT, limit)
+    return SearchResult(path, path.distance, visited, expanded)
+
+
+def _bounded_dfs(start, heuristic, goal, unitCost, bound, table, tableSize, counters):
+    """
+    One iteration of iterative deepening: depth-first search from start that does not go past nodes whose f = g + h is larger
+    than bound. Only the current path and one neighbor iterator per node on it are kept. table is a transposition table,
+    mapping node ids to the smallest g they were reached with in this iteration, limited to tableSize entries, or None.
+
+    Returns the pair (path, costs) of the nodes and edge costs to the first goal found, or (None, nextBound), where
+    nextBound is the smallest f value that was over the bound (inf if there was none).
+    """
+    nextBound = float("inf")
+    nodes = [start]
+    costs = []
+    gs = [0]
+    onPath = {start.get_id()}
+    iterators = [iter(counters.expand(start))]
+    while len(iterators) > 0:
+        if counters.exceeded(len(nodes)):
+            return None, nextBound
+        edge = next(iterators[-1], None)
+        if edge is None:
+            # all neighbors done, backtrack
+            iterators.pop()
+            onPath.discard(nodes.pop().get_id())
+            gs.pop()
+            if costs:
+                costs.pop()
+            continue
+        target = edge.target
+        targetId = target.get_id()
+        # Loops are avoided by never going back to a node on the current path
+        if targetId in onPath:
+            continue
+        g = gs[-1] + (1 if unitCost else edge.cost)
+        counters.visited += 1
+        if table is not None:
+            old = table.get(targetId)
+            if old is not None and old <= g:
+                continue
+            table[targetId] = g
+            table.move_to_end(targetId)
+            if len(table) > tableSize:
+                table.popitem(last=False)
+        f = g + heuristic(target)
+        if f > bound:
+            if f < nextBound:
+                nextBound = f
+            continue
+        if goal(target):
+            return nodes + [target], costs + [edge.cost]
+        nodes.append(target)
+        costs.append(edge.cost)
+        gs.append(g)
+        onPath.add(targetId)
+        iterators.append(iter(counters.expand(target)))
+    return None, nextBound
+
+
+def _iterative_deepening(start, heuristic, goal, unitCost, maxBound, table_size, limits, stats):
+    # Runs _bounded_dfs with increasing bounds, see iddfs and idastar
+    counters = SearchCounters(limits)
+    counters.visited = 1
+    if stats is not None:
+        _, goal, heuristic = stats.attach(counters, None, goal, heuristic)
+    iterations = []
+    result = None
+    if goal(start):
+        result = SearchResult(Path({start.get_id(): (None, 0, None)}, start), 0, 1, 0)
+    bound = heuristic(start)
+    while result is None:
+        visited = counters.visited
+        expanded = counters.expanded
+        table = OrderedDict() if table_size > 0 else None
+        path, costs = _bounded_dfs(start, heuristic, goal, unitCost, bound, table, table_size, counters)
+        iterations.append({"bound": bound, "visited": counters.visited - visited, "expanded": counters.expanded - expanded})
+        if path is not None:
+            parents = {start.get_id(): (None, 0, None)}
+            for (parent, node, cost) in zip(path, path[1:], costs):
+                parents[node.get_id()] = (parent, cost, None)
+            result = SearchResult(Path(parents, path[-1]), sum(costs), counters.visited, counters.expanded)
+        elif counters.limit is not None:
+            result = SearchResult([], 0, counters.visited, counters.expanded, LIMIT_HIT, counters.limit)
+        elif costs == float("inf") or (maxBound is not None and costs > maxBound):
+            # nothing was cut off by the bound, or the next bound is too large, so there is no (short enough) path
+            result = SearchResult([], 0, counters.visited, counters.expanded, EXHAUSTED)
+        else:
+            bound = costs
+    result.iterations = iterations
+    return result
+
+
+def iddfs(start, goal, max_depth=None, table_size=0, limits=None, stats=None):
+    """
+    Iterative deepening depth-first search. Runs a depth-first search that goes at most 0, 1, 2, ... edges deep, until a goal is
+    found. Like breadth-first search, it finds a path with the smallest number of edges, but it only needs memory for the
+    nodes on the current path, which makes it suitable for large and infinite graphs such as graph.InfNode.
+
+    max_depth is the largest depth that is tried (None for no limit). table_size enables a transposition table of at most that
+    many nodes, which prunes nodes that were already reached with the same or a smaller depth in the current iteration;
+    the least recently used entries are evicted when it is full.
+
+    Returns a searchstate.SearchResult like bfs, whose visited and expanded counts are totals over all iterations. Its
+    iterations attribute lists the bound (depth), visited and expanded counts of every iteration. Nodes are counted as
+    visited every time they are generated. The optional stats is a searchstats.SearchStats object that counts and times the
+    phases of the search.
+    """
+    return _iterative_deepening(start, default_heuristic, goal, True, max_depth, table_size, limits, stats)
+
+
+def idastar(start, heuristic, goal, table_size=0, limits=None, stats=None):
+    """
+    Iterative deepening A* (IDA*). Runs depth-first searches that do not go past nodes with f = g + h larger than a bound,
+    starting with the bound h(start) and raising it to the smallest f value that was cut off in the previous iteration. With
+    an admissible heuristic, the path found is optimal, like with astar, but only the current path is kept in memory.
+
+    table_size enables a bounded transposition table, see iddfs. Returns a searchstate.SearchResult with the counts of all
+    iterations, and the counts per iteration in its iterations attribute. stats is an optional searchstats.SearchStats.
+    """
+    return _iterative_deepening(start, heuristic, goal, False, None, table_size, limits, stats)
+
+
+def run_all(name, start, heuristic, goal, limits=None):
     print("running test", name)
     print("Breadth-First Search")
-    result = bfs(start, goal)
+    result = bfs(start, goal, limits)
     print_path(result)
 
     print("\nDepth-First Search")
-    result = dfs(start, goal)
+    result = dfs(start, goal, limits)
     print_path(result)
 
     print("\nGreedy Search (default heuristic)")
-    result = greedy(start, default_heuristic, goal)
+    result = greedy(start, default_heuristic, goal, limits)
     print_path(result)
 
     print("\nGreedy Search")
-    result = greedy(start, heuristic, goal)
+    result = greedy(start, heuristic, goal, limits)
     print_path(result)
 
     print("\nA* Search (default heuristic)")
-    result = astar(start, default_heuristic, goal)
+    result = astar(start, default_heuristic, goal, limits)
     print_path(result)
 
     print("\nA* Search")
-    result = astar(start, heuristic, goal)
+    result = astar(start, heuristic, goal, limits)
     print_path(result)
 
     print("\n\n")
@@ -325,11 +641,108 @@ def print_path(result):
         print("Path found with cost", cost)
         for n in path:
             print(n.get_id())
+    elif getattr(result, "status", None) == LIMIT_HIT:
+        print("No path found (%s limit hit)" % result.limit)
     else:
         print("No path found")
     print("\n")
 
 
+def _test_graphs(rng, count):
+    # Austria, TestCase and count random graphs with small integer costs (so that all sums are exact), some of which are
+    # not connected
+    graphs = [graph.Austria, graph.TestCase]
+    for k in range(count):
+        n = rng.randint(2, 30)
+        edges = [(rng.randrange(n), rng.randrange(n), float(rng.randint(1, 20))) for i in range(rng.randint(n // 2, 3 * n))]
+        graphs.append(graph.make_geom_graph(range(n), [(a, b, d) for (a, b, d) in edges if a != b]))
+    return graphs
+
+
+def _test_pairs(rng, nodes):
+    # all pairs of nodes of the small graphs of graph.py, 20 random pairs of the others
+    ids = list(nodes)
+    if nodes is graph.Austria or nodes is graph.TestCase:
+        return [(a, b) for a in ids for b in ids]
+    return [(rng.choice(ids), rng.choice(ids)) for i in range(20)]
+
+
+def check_bidirectional():
+    """
+    Compares the three modes of bidirectional with dijkstra (and bfs for unit_cost) on all pairs of nodes of Austria and
+    TestCase and on random graphs, and the Dijkstra mode also with small limits. The heuristics of the A* mode are landmarks.LandmarkIndex heuristics, which are
+    consistent.
+    """
+    import random
+    from landmarks import LandmarkIndex
+
+    rng = random.Random(7)
+    for nodes in _test_graphs(rng, 200):
+        index = LandmarkIndex(nodes, 4)
+        for (a, b) in _test_pairs(rng, nodes):
+            goal = lambda n: n.get_id() == b
+            expected = dijkstra(nodes[a], goal)
+            results = [bidirectional(nodes[a], nodes[b])]
+            if expected.path:
+                results.append(bidirectional(nodes[a], nodes[b], heuristic=index.heuristic(b),
+                                             reverse_heuristic=index.heuristic(a)))
+            for result in results:
+                assert bool(result.path) == bool(expected.path), (a, b)
+                assert result.distance == expected.distance, (a, b, result.distance, expected.distance)
+                if result.path:
+                    assert result.path[0].get_id() == a and result.path[-1].get_id() == b, (a, b)
+                    assert sum(edge.cost for edge in result.path.edges()) == result.distance, (a, b)
+            result = bidirectional(nodes[a], nodes[b], unit_cost=True)
+            assert bool(result.path) == bool(expected.path), (a, b)
+            if result.path and a != b:
+                # bfs does not consider the start a goal, so it can only be compared on pairs of different nodes
+                assert len(result.path) == len(bfs(nodes[a], goal).path), (a, b)
+            # a search stopped by a limit must not claim a path it has not proven to be the shortest
+            for k in range(1, 8):
+                for limits in (SearchLimits(max_expanded=k), SearchLimits(max_frontier=k)):
+                    result = bidirectional(nodes[a], nodes[b], limits=limits)
+                    if result.status == LIMIT_HIT:
+                        assert result.limit is not None and (not result.path or result.distance >= expected.distance)
+                    else:
+                        assert result.distance == expected.distance, (a, b, k, result.distance, expected.distance)
+                        assert bool(result.path) == bool(expected.path), (a, b, k)
+    print("Bidirectional search checks ok")
+
+
+def check_iterative_deepening():
+    """
+    Compares iddfs with bfs (by the number of edges of the path) and idastar with dijkstra on all pairs of nodes of Austria
+    and TestCase, without a transposition table, with a small one that has to evict entries, and with one large enough for
+    the whole graph. idastar runs with the default heuristic and with landmarks.LandmarkIndex heuristics (the heuristic
+    table of TestCase is not admissible).
+    """
+    from landmarks import LandmarkIndex
+
+    for nodes in (graph.Austria, graph.TestCase):
+        index = LandmarkIndex(nodes, 4)
+        visited = {}
+        for a in nodes:
+            for b in nodes:
+                goal = lambda n: n.get_id() == b
+                shortest = dijkstra(nodes[a], goal)
+                hops = len(bfs(nodes[a], goal).path) if a != b else 1
+                for tableSize in (0, 3, 1000):
+                    for (kind, result) in [("iddfs", iddfs(nodes[a], goal, table_size=tableSize)),
+                                           ("idastar", idastar(nodes[a], default_heuristic, goal, table_size=tableSize)),
+                                           ("idastar landmarks", idastar(nodes[a], index.heuristic(b), goal,
+                                                                         table_size=tableSize))]:
+                        assert result.path[0].get_id() == a and result.path[-1].get_id() == b, (kind, a, b)
+                        assert sum(edge.cost for edge in result.path.edges()) == result.distance, (kind, a, b)
+                        if kind == "iddfs":
+                            assert len(result.path) == hops, (a, b, tableSize)
+                        else:
+                            assert result.distance == shortest.distance, (kind, a, b, tableSize)
+                        visited[tableSize] = visited.get(tableSize, 0) + result.visited
+        # the transposition table has to prune something
+        assert visited[1000] < visited[3] < visited[0], visited
+    print("Iterative deepening checks ok")
+
+
 def main():
     """
     You are free (and encouraged) to change this function to add more test cases.
@@ -343,6 +756,10 @@ def main():
           will take a noticeable amount (a couple of seconds).
         - pathfinding on the same infinite graph, but with infinitely many goal nodes. Each node corresponding to a number greater 1000 that is congruent to 63 mod 123 is a valid goal node. As before, a non-admissible
           heuristic is provided, which greatly accelerates the search process. 
+
+    Depth-first search never terminates on the infinite graph, so the infinite test cases are run with a limit on the frontier size.
+
+    At the end, the check functions compare the other search algorithms of this module with dijkstra and bfs on many graphs.
     """
     target = "Bregenz"
 
@@ -365,6 +782,7 @@ def main():
     run_all("TestCase", graph.TestCase["Lancaster"], testHeuristic, testGoal)
 
     target = 2050
+    infLimits = SearchLimits(max_frontier=15000)
 
     def infheuristic(n):
         return abs(n.get_id() - target)
@@ -372,7 +790,7 @@ def main():
     def infgoal(n):
         return n.get_id() == target
 
-    run_all("Infinite Graph (simple)", graph.InfNode(1), infheuristic, infgoal)
+    run_all("Infinite Graph (simple)", graph.InfNode(1), infheuristic, infgoal, infLimits)
 
     def multiheuristic(n):
         return abs(n.get_id() % 123 - 63)
@@ -380,7 +798,16 @@ def main():
     def multigoal(n):
         return n.get_id() > 1000 and n.get_id() % 123 == 63
 
-    run_all("Infinite Graph (multi)", graph.InfNode(1), multiheuristic, multigoal)
+    run_all("Infinite Graph (multi)", graph.InfNode(1), multiheuristic, multigoal, infLimits)
+
+    print("Bidirectional Search (Austria)")
+    print_path(bidirectional(graph.Austria["Eisenstadt"], graph.Austria["Bregenz"]))
+
+    print("Bidirectional Search (Infinite Graph)")
+    print_path(bidirectional(graph.InfNode(1), graph.InfNode(2050), implicitgraph.inf_reverse_neighbors))
+
+    check_bidirectional()
+    check_iterative_deepening()
 
 
 if __name__ == "__main__":
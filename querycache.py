@@ -0,0 +1,231 @@
+"""
+Cache for the results of repeated queries on static graphs, for traffic that asks for the same few (start, goal) pairs over
+and over.
+"""
+import time
+from collections import OrderedDict
+
+import pathfinding
+from batch import NodeGoal
+from searchstate import Path, SearchResult, LIMIT_HIT
+
+
+class QueryCache:
+    """
+    Remembers the results of the searches in pathfinding.py by (algorithm, start id, goal key, heuristic key). The goal and
+    heuristic keys default to the goal and heuristic objects themselves, so a query only hits the cache if it passes the
+    same function objects as before, or goals that compare equal, like batch.NodeGoal. Queries that create new lambdas
+    every time have to pass goal_key and heuristic_key, e.g. the target id and the name of the heuristic.
+
+    At most max_size results are kept, the least recently used ones are evicted first, and with ttl set, results older than
+    ttl seconds are not used any more. Results of searches that ran into their limits are not cached.
+
+    Shortest paths are reused for the nodes on them: every prefix of a shortest path is itself a shortest path, so once
+    dijkstra (or astar with the default heuristic) has found the path from a to b, a query with a NodeGoal for any node c on
+    that path is answered with the part from a to c. These answers have visited and expanded counts of 0.
+
+    The cache can not see changes to the graph. After a change, call invalidate(), or pass version, a function returning
+    the current version of the graph (e.g. lambda: planner.version for a replanning.DStarLite); results stored under a
+    different version are dropped when they are looked up.
+
+    hits and misses count the lookups that were and were not answered from the cache (prefix_hits the hits answered with a
+    part of a longer path), evictions the results evicted for space, and expirations the results dropped because of their
+    age, an older version or invalidate().
+    """
+    def __init__(self, max_size=1024, ttl=None, version=None, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = version
+        self.clock = clock
+        # key -> (result, time stored, version, prefix keys)
+        self.cache = OrderedDict()
+        # ("shortest", start id, node id) -> (key of the cached shortest path through the node, position of the node)
+        self.prefixes = {}
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _version(self):
+        return self.version() if self.version is not None else None
+
+    def _lookup(self, key, version):
+        # returns the entry for key if it is still valid, and drops it otherwise
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if entry[2] != version or (self.ttl is not None and self.clock() - entry[1] > self.ttl):
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self.cache.move_to_end(key)
+        return entry
+
+    def _remove(self, key):
+        entry = self.cache.pop(key)
+        for prefix in entry[3]:
+            if self.prefixes.get(prefix, (None,))[0] == key:
+                del self.prefixes[prefix]
+
+    def search(self, algorithm, start, goal, heuristic=pathfinding.default_heuristic, goal_key=None, heuristic_key=None,
+               limits=None):
+        """
+        Returns the result of the search with the given name (see pathfinding.ALGORITHMS) from start to goal, from the cache
+        if possible. The result is a searchstate.SearchResult like the one of the search itself; cached results are shared
+        between the queries that hit them.
+        """
+        if algorithm in ("dijkstra", "astar") and heuristic is pathfinding.default_heuristic:
+            # both find shortest paths, without a heuristic that could tell them apart
+            shortest = True
+            heuristic_key = None
+        else:
+            shortest = False
+            if heuristic_key is None:
+                heuristic_key = heuristic
+        if goal_key is None:
+            goal_key = goal
+        startId = start.get_id()
+        key = (algorithm, startId, goal_key, heuristic_key)
+        version = self._version()
+
+        entry = self._lookup(key, version)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+        if shortest and isinstance(goal, NodeGoal):
+            prefix = self.prefixes.get(("shortest", startId, goal.target))
+            entry = self._lookup(prefix[0], version) if prefix is not None else None
+            if entry is not None:
+                self.prefix_hits += 1
+                self.hits += 1
+                return self._prefix(entry[0], prefix[1])
+
+        self.misses += 1
+        result = pathfinding.ALGORITHMS[algorithm](start, heuristic, goal, limits)
+        if result.status != LIMIT_HIT:
+            self._store(key, _compact(result), version, shortest)
+        return self.cache[key][0] if key in self.cache else result
+
+    def _store(self, key, result, version, shortest):
+        prefixes = []
+        if shortest and result.path:
+            startId = key[1]
+            for (i, node) in enumerate(result.path):
+                prefix = ("shortest", startId, node.get_id())
+                self.prefixes[prefix] = (key, i)
+                prefixes.append(prefix)
+        if key in self.cache:
+            self._remove(key)
+        self.cache[key] = (result, self.clock(), version, prefixes)
+        while len(self.cache) > self.max_size:
+            self._remove(next(iter(self.cache)))
+            self.evictions += 1
+
+    @staticmethod
+    def _prefix(result, position):
+        # the part of the cached path result up to the node at the given position
+        nodes = result.path.nodes()
+        distance = result.prefix_distances[position]
+        return SearchResult(Path(result.path.parents, nodes[position]), distance, 0, 0)
+
+    def invalidate(self):
+        """
+        Drops all cached results, e.g. after the graph was changed. They are counted as expirations.
+        """
+        self.expirations += len(self.cache)
+        self.cache.clear()
+        self.prefixes.clear()
+
+    def clear(self):
+        self.cache.clear()
+        self.prefixes.clear()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self):
+        """
+        Exports the cache statistics as a flat dictionary.
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "prefix_hits": self.prefix_hits, "misses": self.misses, "evictions": self.evictions,
+                "expirations": self.expirations, "size": len(self.cache),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+def _compact(result):
+    # Copies result with a path that only keeps the parent map entries of the nodes on the path, instead of the whole
+    # parent map of the search, and with the distances from the start to every node on the path, added up from the start
+    if not result.path:
+        return result
+    nodes = result.path.nodes()
+    edges = result.path.edges()
+    parents = {nodes[0].get_id(): (None, 0, None)}
+    distances = [0]
+    for (i, edge) in enumerate(edges):
+        parents[nodes[i + 1].get_id()] = (nodes[i], edge.cost, None)
+        distances.append(distances[-1] + edge.cost)
+    compact = SearchResult(Path(parents, nodes[-1]), result.distance, result.visited, result.expanded, result.status,
+                           result.limit)
+    compact.prefix_distances = distances
+    return compact
+
+
+def main():
+    """
+    Answers skewed random queries on Austria and TestCase through the cache, and checks them against fresh searches.
+    """
+    import random
+    import graph
+    from replanning import DStarLite
+
+    rng = random.Random(20)
+    for (name, nodes) in [("Austria", graph.Austria), ("TestCase", graph.TestCase)]:
+        cache = QueryCache(max_size=16)
+        ids = list(nodes)
+        hot = [(rng.choice(ids), rng.choice(ids)) for i in range(5)]
+        (cached, fresh) = (0.0, 0.0)
+        for k in range(2000):
+            (a, b) = rng.choice(hot) if rng.random() < 0.9 else (rng.choice(ids), rng.choice(ids))
+            algorithm = rng.choice(["astar", "dijkstra", "bfs"])
+            began = time.perf_counter()
+            result = cache.search(algorithm, nodes[a], NodeGoal(b))
+            cached += time.perf_counter() - began
+            began = time.perf_counter()
+            expected = pathfinding.ALGORITHMS[algorithm](nodes[a], pathfinding.default_heuristic, NodeGoal(b), None)
+            fresh += time.perf_counter() - began
+            assert result.distance == expected.distance, (algorithm, a, b, result.distance, expected.distance)
+            assert [n.get_id() for n in result.path][-1:] == [n.get_id() for n in expected.path][-1:], (algorithm, a, b)
+        print(name, "%.4fs cached, %.4fs fresh" % (cached, fresh), cache.as_dict())
+
+    # expiry with a clock that only moves when told to
+    now = [0.0]
+    cache = QueryCache(ttl=10, clock=lambda: now[0])
+    cache.search("astar", graph.Austria["Graz"], NodeGoal("Bregenz"))
+    now[0] = 5.0
+    cache.search("astar", graph.Austria["Graz"], NodeGoal("Bregenz"))
+    now[0] = 20.0
+    cache.search("astar", graph.Austria["Graz"], NodeGoal("Bregenz"))
+    assert (cache.hits, cache.misses, cache.expirations) == (1, 2, 1)
+
+    # invalidation when a planner changes the costs of the graph
+    nodes = graph.make_geom_graph(["a", "b", "c"], [("a", "b", 1), ("b", "c", 1), ("a", "c", 5)])
+    planner = DStarLite(nodes, "a", "c")
+    cache = QueryCache(version=lambda: planner.version)
+    assert cache.search("dijkstra", nodes["a"], NodeGoal("c")).distance == 2
+    assert cache.search("dijkstra", nodes["a"], NodeGoal("b")).distance == 1
+    assert cache.prefix_hits == 1
+    planner.update([("a", "b", 10)])
+    assert cache.search("dijkstra", nodes["a"], NodeGoal("c")).distance == 5
+    # invalidate frees the results and their prefixes right away
+    cache.invalidate()
+    assert not cache.cache and not cache.prefixes and cache.expirations == 2
+    assert cache.search("dijkstra", nodes["a"], NodeGoal("b")).distance == 6 and cache.prefix_hits == 1
+    print("expiry and invalidation ok")
+
+
+if __name__ == "__main__":
+    main()
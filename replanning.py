@@ -0,0 +1,279 @@
+"""
+Incremental replanning on graphs whose edge costs change between queries, such as road networks with traffic and closures.
+
+DStarLite keeps the state of its search between queries. After a batch of edge cost changes, it only repairs the part of
+its shortest path tree that the changes affect, instead of searching the whole graph again like pathfinding.astar would.
+
+    python replanning.py
+
+checks the replanned paths against pathfinding.dijkstra after random updates, and compares the time of the two.
+"""
+from heapq import heappush, heappop
+
+import graph
+from searchstate import Path, SearchResult, EXHAUSTED
+
+
+class DStarLite:
+    """
+    D* Lite (Koenig and Likhachev) on a graph built with graph.make_geom_graph, given as its dictionary of nodes, between a
+    start and a goal node (nodes or node ids).
+
+    The search runs backward from the goal: g is the distance of a node to the goal as of its last expansion, and rhs the
+    one-step lookahead value min(cost + g) over its edges. Nodes whose g and rhs differ are inconsistent and queued, ordered
+    by min(g, rhs) plus the heuristic estimate of their distance from the start, and the search stops as soon as the start
+    is consistent and no queued node could improve it. After an update, only the nodes next to the changed edges become
+    inconsistent, and the repair spreads from there as far as the change matters. With a fixed start this is LPA*; move()
+    lets the start follow a traveller along the path without invalidating the queue.
+
+    A change costs as much as the part of the tree that hangs off the changed edges: changes away from the current path are
+    almost free, while closing roads on the path close to the goal, which the distances of most nodes depend on, can take
+    longer than a new search from scratch.
+
+    heuristic(a, b) estimates the distance between the nodes a and b. It has to be admissible and satisfy the triangle
+    inequality, and defaults to 0, which makes every query an incremental Dijkstra search.
+    """
+    def __init__(self, nodes, start, goal, heuristic=None):
+        self.nodes = nodes
+        self.start = self._node(start)
+        self.goal = self._node(goal)
+        self.heuristic = heuristic if heuristic is not None else lambda a, b: 0
+        # added to all keys whenever the start moves, so that the keys already queued stay lower bounds (see move)
+        self.km = 0
+        self.g = {}
+        self.rhs = {self.goal.get_id(): 0}
+        # heap of (key, counter, node id, node) entries, queued maps the ids of the queued nodes to the (key, counter) of
+        # their live entry, the others are skipped when they reach the top
+        self.heap = []
+        self.queued = {}
+        self.counter = 0
+        self.expanded = 0
+        # counts the batches of changes applied to the graph by update, e.g. for querycache.QueryCache
+        self.version = 0
+        self._push(self.goal)
+
+    def _node(self, node):
+        return node if isinstance(node, graph.Node) else self.nodes[node]
+
+    def _key(self, node):
+        nid = node.get_id()
+        inf = float("inf")
+        m = min(self.g.get(nid, inf), self.rhs.get(nid, inf))
+        return (m + self.heuristic(self.start, node) + self.km, m)
+
+    def _push(self, node):
+        key = self._key(node)
+        self.queued[node.get_id()] = (key, self.counter)
+        heappush(self.heap, (key, self.counter, node.get_id(), node))
+        self.counter += 1
+
+    def _top(self):
+        # the live entry with the smallest key, or None if no node is queued
+        heap = self.heap
+        while heap and self.queued.get(heap[0][2]) != heap[0][:2]:
+            heappop(heap)
+        return heap[0] if heap else None
+
+    def _requeue(self, node):
+        # queues node if it is inconsistent (with its current key), and removes it from the queue otherwise
+        nid = node.get_id()
+        inf = float("inf")
+        if self.g.get(nid, inf) != self.rhs.get(nid, inf):
+            self._push(node)
+        else:
+            self.queued.pop(nid, None)
+
+    def _update_vertex(self, node):
+        # recomputes rhs of node from all its edges
+        nid = node.get_id()
+        if nid != self.goal.get_id():
+            inf = float("inf")
+            g = self.g
+            best = inf
+            for edge in node.get_neighbors():
+                cost = edge.cost + g.get(edge.target.get_id(), inf)
+                if cost < best:
+                    best = cost
+            self.rhs[nid] = best
+        self._requeue(node)
+
+    def _compute(self):
+        # expands inconsistent nodes until the start is consistent and its distance final, returns the number of expansions
+        inf = float("inf")
+        g = self.g
+        rhs = self.rhs
+        sid = self.start.get_id()
+        goal = self.goal.get_id()
+        expanded = 0
+        while True:
+            top = self._top()
+            if top is None or (top[0] >= self._key(self.start) and rhs.get(sid, inf) == g.get(sid, inf)):
+                break
+            (key, _, nid, node) = heappop(self.heap)
+            del self.queued[nid]
+            newKey = self._key(node)
+            if key < newKey:
+                # the start moved since the node was queued
+                self._push(node)
+                continue
+            expanded += 1
+            # the graph is symmetric, so the predecessors of a node are its neighbors, over edges with the same cost
+            if g.get(nid, inf) > rhs[nid]:
+                # overconsistent: the distance of node went down, which can only lower the rhs of its neighbors
+                d = g[nid] = rhs[nid]
+                for edge in node.get_neighbors():
+                    target = edge.target
+                    tid = target.get_id()
+                    if tid != goal and edge.cost + d < rhs.get(tid, inf):
+                        rhs[tid] = edge.cost + d
+                        self._requeue(target)
+            else:
+                # underconsistent: the distance of node went up, so the neighbors whose rhs came from it need a new one
+                old = g[nid]
+                g[nid] = inf
+                for edge in node.get_neighbors():
+                    if rhs.get(edge.target.get_id(), inf) == edge.cost + old:
+                        self._update_vertex(edge.target)
+                self._update_vertex(node)
+        self.expanded += expanded
+        return expanded
+
+    def plan(self):
+        """
+        Brings the search up to date and returns the shortest path from the start to the goal as a
+        searchstate.SearchResult, like pathfinding.astar. visited is the number of nodes the search has touched since it was
+        created, expanded the number of nodes expanded for this query.
+        """
+        expanded = self._compute()
+        inf = float("inf")
+        g = self.g
+        visited = len(self.rhs)
+        if g.get(self.start.get_id(), inf) == inf:
+            return SearchResult([], 0, visited, expanded, EXHAUSTED)
+        # follow the cheapest edges down the distances to the goal
+        node = self.start
+        parents = {node.get_id(): (None, 0, None)}
+        distance = 0
+        goal = self.goal.get_id()
+        while node.get_id() != goal:
+            best = None
+            for (index, edge) in enumerate(node.get_neighbors()):
+                if edge.target.get_id() in parents:
+                    continue
+                cost = edge.cost + g.get(edge.target.get_id(), inf)
+                if best is None or cost < best[0]:
+                    best = (cost, index, edge)
+            (cost, index, edge) = best
+            parents[edge.target.get_id()] = (node, edge.cost, index)
+            distance = distance + edge.cost
+            node = edge.target
+        return SearchResult(Path(parents, node), distance, visited, expanded)
+
+    def update(self, changes):
+        """
+        Applies a batch of edge cost changes, a list of (a, b, cost) triples of node ids, and returns the new plan(). Every
+        edge between a and b gets the new cost, in both directions, like the edges of graph.make_geom_graph. A cost of
+        float("inf") closes the edges.
+        """
+        touched = {}
+        for (a, b, cost) in changes:
+            for (source, target) in ((a, b), (b, a)):
+                node = self.nodes[source]
+                for edge in node.get_neighbors():
+                    if edge.target.get_id() == target:
+                        edge.cost = cost
+                touched[source] = node
+        self.version += 1
+        for node in touched.values():
+            self._update_vertex(node)
+        return self.plan()
+
+    def move(self, start):
+        """
+        Moves the start to the given node (or node id), e.g. the next node on the path, without discarding the search.
+        """
+        start = self._node(start)
+        self.km += self.heuristic(self.start, start)
+        self.start = start
+
+
+def main():
+    """
+    Random updates on random graphs and on a road grid, checked against pathfinding.dijkstra from scratch.
+    """
+    import random
+    import time
+    import pathfinding
+
+    inf = float("inf")
+
+    def shortest(nodes, start, goal):
+        result = pathfinding.dijkstra(nodes[start], lambda n: n.get_id() == goal)
+        return result.distance if result.path else inf
+
+    rng = random.Random(19)
+    for k in range(100):
+        n = rng.randint(2, 40)
+        edges = [(rng.randrange(n), rng.randrange(n), rng.randint(1, 20)) for i in range(rng.randint(n, 3 * n))]
+        edges = [(a, b, d) for (a, b, d) in edges if a != b]
+        nodes = graph.make_geom_graph(range(n), edges)
+        (start, goal) = (rng.randrange(n), rng.randrange(n))
+        planner = DStarLite(nodes, start, goal)
+        result = planner.plan()
+        for round in range(10):
+            expected = shortest(nodes, start, goal)
+            assert (result.distance if result.path else inf) == expected, (k, round, result.distance, expected)
+            if result.path:
+                assert sum(edge.cost for edge in result.path.edges()) == result.distance
+                if len(result.path) > 1 and rng.random() < 0.3:
+                    start = result.path[1].get_id()
+                    planner.move(start)
+            changes = []
+            for i in range(rng.randint(1, 5)):
+                if edges:
+                    (a, b, d) = rng.choice(edges)
+                    changes.append((a, b, rng.choice([inf, rng.randint(1, 30)])))
+            result = planner.update(changes)
+    print("random graphs ok")
+
+    # road grid with integer costs, where the Manhattan distance (the cost is at least 1) is a consistent heuristic
+    side = 150
+    edges = []
+    for r in range(side):
+        for c in range(side):
+            if c + 1 < side:
+                edges.append(((r, c), (r, c + 1), rng.randint(1, 10)))
+            if r + 1 < side:
+                edges.append(((r, c), (r + 1, c), rng.randint(1, 10)))
+    nodes = graph.make_geom_graph([(r, c) for r in range(side) for c in range(side)], edges)
+    (start, goal) = ((0, 0), (side - 1, side - 1))
+    manhattan = lambda a, b: abs(a.get_id()[0] - b.get_id()[0]) + abs(a.get_id()[1] - b.get_id()[1])
+    began = time.perf_counter()
+    planner = DStarLite(nodes, start, goal, manhattan)
+    result = planner.plan()
+    print("%dx%d grid, initial plan: %.3fs, %d expanded" % (side, side, time.perf_counter() - began, result.expanded))
+    for near in (False, True):
+        (replanning, scratch, expanded) = (0.0, 0.0, 0)
+        for round in range(20):
+            # close or slow down a few roads, anywhere or on the current path
+            changes = []
+            for i in range(10):
+                if near and result.path:
+                    (a, b) = rng.choice(list(zip(result.path.ids(), result.path.ids()[1:])))
+                else:
+                    (a, b, d) = rng.choice(edges)
+                changes.append((a, b, rng.choice([inf, rng.randint(1, 30)])))
+            began = time.perf_counter()
+            result = planner.update(changes)
+            replanning += time.perf_counter() - began
+            expanded += result.expanded
+            began = time.perf_counter()
+            expected = pathfinding.astar(nodes[start], lambda n: manhattan(n, nodes[goal]), lambda n: n.get_id() == goal)
+            scratch += time.perf_counter() - began
+            assert result.distance == shortest(nodes, start, goal) == expected.distance
+        print("20 batches of 10 updates %s: replanning %.3fs (%d expanded), astar from scratch %.3fs (%d expanded)" %
+              ("on the path" if near else "anywhere", replanning, expanded, scratch, expected.expanded * 20))
+
+
+if __name__ == "__main__":
+    main()
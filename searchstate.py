@@ -0,0 +1,306 @@
+import time
+from collections import namedtuple
+
+# How a search ended, see SearchResult
+FOUND = "found"
+EXHAUSTED = "exhausted"
+LIMIT_HIT = "limit-hit"
+
+# Kinds of SearchEvent
+EXPANDED = "expanded"
+GOAL = "goal"
+
+
+class SearchLimits:
+    """
+    Resource limits that can be passed to any of the searches in pathfinding.py. Every limit is optional, None means unlimited:
+        - max_frontier is the maximum number of nodes on the frontier
+        - max_expanded is the maximum number of nodes that may be expanded
+        - max_seconds is the wall-clock time budget, measured from the start of the search
+        - max_bytes is an approximate memory budget for the closed set, parent map and frontier
+
+    A search that runs into one of its limits stops without a path. Its result has the status LIMIT_HIT, and the name of the
+    limit that was hit ("frontier", "expanded", "time" or "memory"), so it can be told apart from a search that exhausted
+    the graph. The same limits object can be reused for any number of searches.
+    """
+    # Rough sizes of a parent map entry (dict slot, tuple and node object) and a frontier entry, for the memory estimate
+    VISITED_BYTES = 200
+    FRONTIER_BYTES = 100
+
+    def __init__(self, max_frontier=None, max_expanded=None, max_seconds=None, max_bytes=None):
+        self.max_frontier = max_frontier
+        self.max_expanded = max_expanded
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+
+    def estimate_bytes(self, visited, frontierSize):
+        return visited * self.VISITED_BYTES + frontierSize * self.FRONTIER_BYTES
+
+    def exceeded(self, state, frontierSize):
+        """
+        Returns the name of the first limit that the search described by state and the size of its frontier is over, or None.
+        """
+        if self.max_frontier is not None and frontierSize > self.max_frontier:
+            return "frontier"
+        if self.max_expanded is not None and state.expanded >= self.max_expanded:
+            return "expanded"
+        if self.max_seconds is not None and time.monotonic() - state.started > self.max_seconds:
+            return "time"
+        if self.max_bytes is not None and self.estimate_bytes(state.visited, frontierSize) > self.max_bytes:
+            return "memory"
+        return None
+
+
+class SearchResult(namedtuple("SearchResult", ["path", "distance", "visited", "expanded"])):
+    """
+    The (path,distance,visited,expanded) 4-tuple returned by the searches. In addition, status tells how the search ended
+    (FOUND, EXHAUSTED or LIMIT_HIT), and limit names the limit that was hit, if any.
+    """
+    def __new__(cls, path, distance, visited, expanded, status=FOUND, limit=None):
+        self = super().__new__(cls, path, distance, visited, expanded)
+        self.status = status
+        self.limit = limit
+        return self
+
+
+# Yielded by the step generators of the searches (e.g. pathfinding.astar_steps, see incremental.py): kind is EXPANDED or
+# GOAL, node the expanded or goal node, and value the priority of the expanded node (the depth for bfs, h for greedy, g for
+# dijkstra and f = g + h for astar) or the distance to the goal
+SearchEvent = namedtuple("SearchEvent", ["kind", "node", "value"])
+
+
+def neighbors_of(node):
+    """
+    Returns the outgoing edges of node. Nodes that can generate their neighbors one at a time (see
+    implicitgraph.ImplicitNode) are asked for an iterator instead of a list.
+    """
+    neighbors = getattr(node, "iter_neighbors", None)
+    if neighbors is not None:
+        return neighbors()
+    return node.get_neighbors()
+
+
+class SearchCounters:
+    """
+    The visited and expanded counters and the limits of a search that keeps no closed set or parent map, like the
+    iterative deepening searches. The stack of nodes on the current path plays the role of the frontier.
+    """
+    def __init__(self, limits=None):
+        self.limits = limits
+        self.limit = None
+        self.started = time.monotonic()
+        self.visited = 0
+        self.expanded = 0
+
+    def expand(self, node):
+        """
+        Counts node as expanded and returns its neighbors, see neighbors_of.
+        """
+        self.expanded += 1
+        return neighbors_of(node)
+
+    def exceeded(self, frontierSize):
+        """
+        Returns True if the search has run into one of its limits, given the current size of its frontier.
+        """
+        if self.limits is None:
+            return False
+        self.limit = self.limits.exceeded(self, frontierSize)
+        return self.limit is not None
+
+
+class SearchState:
+    """
+    Bookkeeping shared by the search algorithms in pathfinding.py: the closed set of visited nodes, the parent map used to
+    reconstruct the path, and the counters reported in the (path,distance,visited,expanded) result.
+
+    Nodes are keyed by their get_id(), so visited checks and parent lookups are dictionary operations instead of linear scans
+    over a list of Node objects.
+    """
+    def __init__(self, start, limits=None):
+        self.start = start
+        self.limits = limits
+        # name of the limit the search ran into, see SearchLimits
+        self.limit = None
+        self.started = time.monotonic()
+        # node id -> (parent node, cost of the edge from the parent, position of the edge in the parent's neighbors), the
+        # start node has no parent
+        self.parents = {start.get_id(): (None, 0, None)}
+        # node id -> cost of the best known path from the start, only maintained by relax()
+        self.g = {start.get_id(): 0}
+        self.expanded = 0
+
+    def visit(self, node, parent, cost, index=None):
+        """
+        Marks node as visited, reached from parent over an edge with the given cost, which is at the given index of the
+        parent's neighbors (if known, see Path.edges). Returns False (and leaves the parent map unchanged) if the node had
+        already been visited.
+        """
+        nid = node.get_id()
+        if nid in self.parents:
+            return False
+        self.parents[nid] = (parent, cost, index)
+        return True
+
+    def relax(self, node, parent, cost, g, index=None):
+        """
+        Records that node can be reached from parent over an edge with the given cost (and index, see visit), with a total
+        path cost of g. Returns True (and updates the parent map) if node was not visited before or g improves on its best
+        known path cost.
+        """
+        nid = node.get_id()
+        old = self.g.get(nid)
+        if old is not None and old <= g:
+            return False
+        self.parents[nid] = (parent, cost, index)
+        self.g[nid] = g
+        return True
+
+    def cost(self, node):
+        """
+        Returns the best known path cost from the start to node, as recorded by relax().
+        """
+        return self.g[node.get_id()]
+
+    def expand(self, node):
+        """
+        Counts node as expanded and returns its neighbors, see neighbors_of.
+        """
+        self.expanded += 1
+        return neighbors_of(node)
+
+    def exceeded(self, frontierSize):
+        """
+        Returns True if the search has run into one of its limits, given the current size of its frontier.
+        """
+        if self.limits is None:
+            return False
+        self.limit = self.limits.exceeded(self, frontierSize)
+        return self.limit is not None
+
+    @property
+    def visited(self):
+        return len(self.parents)
+
+    def result(self, node=None):
+        """
+        Returns the SearchResult for a search that ended in node, or that did not find a path if node is None.
+        """
+        if node is None:
+            status = LIMIT_HIT if self.limit is not None else EXHAUSTED
+            return SearchResult([], 0, self.visited, self.expanded, status, self.limit)
+        path = Path(self.parents, node)
+        return SearchResult(path, path.distance, self.visited, self.expanded)
+
+
+class Path:
+    """
+    The path found by a search, represented by the parent map of the search: for every node id, the parent node, the cost
+    of the edge from the parent, and the position of that edge among the parent's neighbors. Nothing is copied when the
+    search ends; the node list, the graph.Edge objects and the edge names are built on first use, each in time linear in
+    the length of the path, and distance and hops walk the parent map without building a list.
+
+    A path can be used as a sequence of the nodes from the start to the end node, like the lists the searches used to
+    return. edges() returns the edges to traverse instead.
+
+    A path can also be continued by the parent map of a backward search (see pathfinding.bidirectional), in which the
+    parent of a node is the next node on the way to the target: then the path leads from the start to node, and on from node
+    to the target of the backward search.
+    """
+    def __init__(self, parents, node, backward=None):
+        self.parents = parents
+        self.node = node
+        self.backward = backward
+        self._nodes = None
+
+    def _chain(self, parents, node):
+        # yields (node, parent, cost, index) for every edge on the way from node to the root of the parent map
+        parent, cost, index = parents[node.get_id()]
+        while parent is not None:
+            yield node, parent, cost, index
+            node = parent
+            parent, cost, index = parents[node.get_id()]
+
+    @property
+    def distance(self):
+        """
+        The sum of the edge costs along the path.
+        """
+        distance = 0
+        for (node, parent, cost, index) in self._chain(self.parents, self.node):
+            distance = distance + cost
+        if self.backward is not None:
+            for (node, parent, cost, index) in self._chain(self.backward, self.node):
+                distance = distance + cost
+        return distance
+
+    @property
+    def hops(self):
+        """
+        The number of edges on the path.
+        """
+        hops = sum(1 for link in self._chain(self.parents, self.node))
+        if self.backward is not None:
+            hops += sum(1 for link in self._chain(self.backward, self.node))
+        return hops
+
+    def nodes(self):
+        """
+        Returns the list of nodes from the start to the end of the path.
+        """
+        if self._nodes is None:
+            nodes = [self.node]
+            for (node, parent, cost, index) in self._chain(self.parents, self.node):
+                nodes.append(parent)
+            nodes.reverse()
+            if self.backward is not None:
+                for (node, parent, cost, index) in self._chain(self.backward, self.node):
+                    nodes.append(parent)
+            self._nodes = nodes
+        return self._nodes
+
+    def ids(self):
+        return [node.get_id() for node in self.nodes()]
+
+    def edges(self):
+        """
+        Returns the list of graph.Edge objects that lead from the start to the end of the path. The edges are taken from the
+        neighbors of the nodes on the path, by their recorded position, or by their target if the position is not known.
+        """
+        edges = []
+        for (node, parent, cost, index) in self._chain(self.parents, self.node):
+            edges.append(_edge_between(parent, node, cost, index))
+        edges.reverse()
+        if self.backward is not None:
+            # the positions recorded by a backward search refer to the reverse neighbors, so look the edges up by target
+            for (node, parent, cost, index) in self._chain(self.backward, self.node):
+                edges.append(_edge_between(node, parent, cost, None))
+        return edges
+
+    def names(self):
+        """
+        Returns the names of the edges of the path, e.g. to print it.
+        """
+        return [edge.name for edge in self.edges()]
+
+    def __len__(self):
+        return self.hops + 1
+
+    def __iter__(self):
+        return iter(self.nodes())
+
+    def __getitem__(self, i):
+        return self.nodes()[i]
+
+    def __repr__(self):
+        return "Path(%r)" % self.ids()
+
+
+def _edge_between(source, target, cost, index):
+    # Returns the edge from source to target, at the given position of source's neighbors if that is known, otherwise the
+    # cheapest edge to target
+    neighbors = source.get_neighbors()
+    if index is not None and index < len(neighbors) and neighbors[index].target == target:
+        return neighbors[index]
+    candidates = [edge for edge in neighbors if edge.target == target]
+    return min(candidates, key=lambda edge: abs(edge.cost - cost))
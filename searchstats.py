@@ -0,0 +1,195 @@
+import time
+from collections import defaultdict
+
+# The phases of a search that SearchStats counts and times
+PHASES = ("expand", "heuristic", "goal", "push", "pop", "path")
+
+
+class SearchStats:
+    """
+    Optional profiling counters for the searches in pathfinding.py, passed as their stats argument. For every phase of the
+    search (expand: generating the neighbors of a node, heuristic and goal: calls of those functions, push and pop: frontier
+    operations, path: building the result and its path), it counts the calls and sums up the time spent in them. It also
+    records the largest frontier size seen.
+
+    Instead of checking whether stats are enabled at every step, the searches hand their state, frontier, goal and heuristic
+    to attach(), which wraps them, so a search without stats runs exactly the same code as before.
+
+    With sample_every=n, only every n-th call of each phase is timed, and its time counted n times, which keeps the overhead
+    of the clock low for phases with many cheap calls. The callbacks on_expand(node), on_push(node) and on_goal(node) are
+    called whenever a node is expanded, added to the frontier, or found to be a goal. A stats object can be reused for
+    several searches, the counters keep adding up.
+    """
+    def __init__(self, sample_every=1, on_expand=None, on_push=None, on_goal=None):
+        self.sample_every = sample_every
+        self.on_expand = on_expand
+        self.on_push = on_push
+        self.on_goal = on_goal
+        self.counts = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.frontier_peak = 0
+        self.searches = 0
+
+    def timed(self, phase, fn, hook=None):
+        """
+        Returns a wrapper around fn that counts and times its calls as the given phase, and passes its arguments to hook
+        after every call.
+        """
+        counts = self.counts
+        seconds = self.seconds
+        every = self.sample_every
+        clock = time.perf_counter
+
+        def wrapper(*args):
+            counts[phase] += 1
+            if counts[phase] % every:
+                result = fn(*args)
+            else:
+                began = clock()
+                result = fn(*args)
+                seconds[phase] += (clock() - began) * every
+            if hook is not None:
+                hook(*args)
+            return result
+        return wrapper
+
+    def attach(self, state, frontier=None, goal=None, heuristic=None, new_search=True):
+        """
+        Instruments one search: wraps the expand, result and exceeded methods of its state (a searchstate.SearchState
+        or SearchCounters) in place, and returns the triple (frontier, goal, heuristic) of wrapped objects that the search
+        has to use instead of the originals. Arguments that are None are returned unchanged. Searches with more than one
+        state pass new_search=False for all but the first one.
+        """
+        if new_search:
+            self.searches += 1
+        state.expand = self.timed("expand", state.expand, self.on_expand)
+        if hasattr(state, "result"):
+            state.result = self.timed("path", state.result)
+        exceeded = state.exceeded
+
+        def track(frontierSize):
+            # searches check their limits with the current frontier size once per expansion
+            if frontierSize > self.frontier_peak:
+                self.frontier_peak = frontierSize
+            return exceeded(frontierSize)
+        state.exceeded = track
+        if frontier is not None:
+            frontier = _InstrumentedFrontier(frontier, self)
+        if goal is not None:
+            goal = self.timed("goal", goal)
+            if self.on_goal is not None:
+                goal = _notify_goal(goal, self.on_goal)
+        if heuristic is not None:
+            heuristic = self.timed("heuristic", heuristic)
+        return frontier, goal, heuristic
+
+    def as_dict(self):
+        """
+        Exports the counters as a flat dictionary, e.g. {"expand.count": 686, "expand.seconds": 0.0012, ...}.
+        """
+        result = {"searches": self.searches, "frontier_peak": self.frontier_peak, "sample_every": self.sample_every}
+        for phase in PHASES:
+            result[phase + ".count"] = self.counts[phase]
+            result[phase + ".seconds"] = self.seconds[phase]
+        return result
+
+
+def _notify_goal(goal, callback):
+    def wrapper(node):
+        found = goal(node)
+        if found:
+            callback(node)
+        return found
+    return wrapper
+
+
+class _InstrumentedFrontier:
+    """
+    Wraps the frontier of a search (a deque, a list or a frontier.PriorityFrontier) to count and time its push and pop
+    operations, and to track its largest size.
+    """
+    def __init__(self, frontier, stats):
+        self.frontier = frontier
+        self.stats = stats
+        if hasattr(frontier, "push"):
+            self.push = stats.timed("push", self._tracked(frontier.push), self._pushed(1))
+        if hasattr(frontier, "append"):
+            self.append = stats.timed("push", self._tracked(frontier.append), self._pushed(0))
+        if hasattr(frontier, "popleft"):
+            self.popleft = stats.timed("pop", frontier.popleft)
+        self.pop = stats.timed("pop", frontier.pop)
+
+    def _tracked(self, fn):
+        frontier = self.frontier
+        stats = self.stats
+
+        def wrapper(*args):
+            result = fn(*args)
+            if len(frontier) > stats.frontier_peak:
+                stats.frontier_peak = len(frontier)
+            return result
+        return wrapper
+
+    def _pushed(self, position):
+        # on_push gets the node, which is the first argument of append, but the second one of PriorityFrontier.push
+        callback = self.stats.on_push
+        if callback is None:
+            return None
+        return lambda first, *rest: callback(first if position == 0 else rest[position - 1])
+
+    def __len__(self):
+        return len(self.frontier)
+
+    def __getattr__(self, name):
+        return getattr(self.frontier, name)
+
+
+def main():
+    """
+    Runs the searches of pathfinding.py over the whole Austria graph with stats and checks the counts against the visited
+    and expanded counts of their results, the hooks against the nodes the searches touched, sampled timing against full
+    timing, and the totals of a reused stats object in as_dict.
+    """
+    import graph
+    import pathfinding
+
+    start = graph.Austria["Graz"]
+    never = lambda n: False
+    searches = {"bfs": lambda stats: pathfinding.bfs(start, never, stats=stats),
+                "dfs": lambda stats: pathfinding.dfs(start, never, stats=stats),
+                "greedy": lambda stats: pathfinding.greedy(start, lambda n: len(n.get_id()), never, stats=stats),
+                "astar": lambda stats: pathfinding.astar(start, lambda n: 0, never, stats=stats),
+                "dijkstra": lambda stats: pathfinding.dijkstra(start, never, stats=stats)}
+    for (name, search) in searches.items():
+        (expanded, pushed) = ([], [])
+        stats = SearchStats(on_expand=expanded.append, on_push=pushed.append)
+        result = search(stats)
+        # every node, including the start, is pushed once and expanded once when the whole graph is searched
+        assert stats.counts["push"] == result.visited == len(graph.Austria), (name, dict(stats.counts))
+        assert stats.counts["expand"] == stats.counts["pop"] == result.expanded == len(graph.Austria), name
+        assert sorted(n.get_id() for n in expanded) == sorted(n.get_id() for n in pushed) == sorted(graph.Austria), name
+        assert stats.counts["path"] == 1 and stats.searches == 1, name
+        assert all(stats.seconds[phase] >= 0 for phase in PHASES), name
+        # sampling changes the timing, not the counts
+        sampled = SearchStats(sample_every=4)
+        search(sampled)
+        assert sampled.counts == stats.counts, name
+        assert name == "dijkstra" or 0 < stats.frontier_peak <= len(graph.Austria), name
+
+    # the goal hook sees the goal once, and a reused stats object adds up
+    goals = []
+    stats = SearchStats(on_goal=goals.append)
+    goal = lambda n: n.get_id() == "Bregenz"
+    first = pathfinding.astar(start, lambda n: graph.AustriaHeuristic["Bregenz"][n.get_id()], goal, stats=stats)
+    second = pathfinding.bfs(start, goal, stats=stats)
+    assert [n.get_id() for n in goals] == ["Bregenz", "Bregenz"]
+    exported = stats.as_dict()
+    assert exported["searches"] == 2
+    assert exported["expand.count"] == first.expanded + second.expanded
+    assert set(exported) == {"searches", "frontier_peak", "sample_every"} | \
+        {phase + suffix for phase in PHASES for suffix in (".count", ".seconds")}
+    print("Search statistics checks ok")
+
+
+if __name__ == "__main__":
+    main()